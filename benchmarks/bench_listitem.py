@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Micro benchmark of the KodiUI list item building against the fake xbmc modules
+
+python benchmarks/bench_listitem.py [items]
+
+SPDX-License-Identifier: MIT
+"""
+import os
+import sys
+import time
+import datetime
+
+BASE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(BASE, 'fakekodi'), os.path.join(BASE, '..', 'lib')]
+
+import xbmcgui
+import xbmcplugin
+from ckfw.kodi import Kodi
+from ckfw.kodiUi import KodiUI
+from ckfw.listItemBuilder import ListItemBuilder
+from ckfw.params import Params
+
+
+def createEntries(pCount):
+    return [Params(mode='play', id=i, title='Title {}'.format(i), channel='ARD', aired=1650000000 + i * 600, duration=1800, image='http://img/{}.jpg'.format(i), url='http://video/{}.mp4'.format(i)) for i in range(pCount)]
+
+
+def legacyListItem(pAddon, pTzBase, pTitle, pUrl, pPlot, pDuration, pAired, pIcon):
+    """ the per item work of KodiUI.addListItem before the builder """
+    listItem = xbmcgui.ListItem(label=pTitle, path=pUrl, offscreen=True)
+    tag = listItem.getVideoInfoTag()
+    tag.setTitle(pTitle)
+    tag.setOriginalTitle(pTitle)
+    tag.setSortTitle(pTitle.lower())
+    tag.setTvShowTitle(pTitle)
+    tag.setPlot(pPlot)
+    tag.setDuration(pDuration)
+    ndate = (pTzBase + datetime.timedelta(seconds=(pAired))).isoformat()
+    airedstring = ndate.replace('T', ' ')
+    tag.setDateAdded(airedstring)
+    tag.setFirstAired(airedstring[:10])
+    tag.setLastPlayed(airedstring)
+    tag.setPremiered(airedstring[:10])
+    tag.setYear(int(airedstring[:4]))
+    listItem.setDateTime(ndate)
+    tag.setPlot(pAddon.localizeString(30101).format(airedstring) + pPlot)
+    listItem.setProperty('IsPlayable', 'True')
+    listItem.setArt({'thumb': pIcon, 'icon': pIcon, 'banner': pIcon, 'fanart': pIcon, 'clearart': pIcon, 'clearlogo': pIcon})
+    return listItem
+
+
+def measure(pName, pCount, pFunction):
+    start = time.time()
+    pFunction()
+    elapsed = time.time() - start
+    print('{:<28} {:>7} items {:>8.4f} sec {:>8.2f} us/item'.format(pName, pCount, elapsed, elapsed * 1000000 / pCount))
+    return elapsed
+
+
+def main(pCount):
+    # Kodi reads the plugin url, handle and parameters from argv
+    sys.argv = ['plugin://plugin.video.ckfwbench/', '1', '?mode=list']
+    addon = Kodi()
+    entries = createEntries(pCount)
+    tzBase = datetime.datetime.fromtimestamp(0)
+    #
+    def legacy():
+        addon.getKodiVersion()
+        for e in entries:
+            legacyListItem(addon, tzBase, e.title, e.url, e.title, e.duration, e.aired, e.image)
+    #
+    def builder():
+        b = ListItemBuilder(addon)
+        airedList = b.formatAiredBulk([e.aired for e in entries])
+        for e, aired in zip(entries, airedList):
+            b.build(e.title, e.url, None, e.title, e.duration, aired, e.image)
+    #
+    def airedDatetime():
+        for e in entries:
+            (tzBase + datetime.timedelta(seconds=(e.aired))).isoformat()
+    #
+    def airedBulk():
+        ListItemBuilder(addon).formatAiredBulk([e.aired for e in entries])
+    #
+    def addItems():
+        xbmcplugin.reset()
+        ui = KodiUI(addon)
+        ui.addItems(entries)
+        ui.render()
+    #
+    measure('aired datetime', pCount, airedDatetime)
+    measure('aired bulk', pCount, airedBulk)
+    measure('listitem legacy', pCount, legacy)
+    measure('listitem builder', pCount, builder)
+    measure('KodiUI.addItems+render', pCount, addItems)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
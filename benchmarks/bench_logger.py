@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Micro benchmark of the Logger against the fake xbmc modules
+
+python benchmarks/bench_logger.py [calls]
+
+SPDX-License-Identifier: MIT
+"""
+import os
+import sys
+import time
+
+BASE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(BASE, 'fakekodi'), os.path.join(BASE, '..', 'lib')]
+
+import xbmc
+from ckfw import logger as ckfwLogger
+from ckfw import utils as pyUtils
+from ckfw.logger import Logger
+from ckfw.params import Params
+
+
+def legacyDebug(pLogger, message, *args):
+    """ the per call work of Logger.debug before the level gating """
+    parts = []
+    for arg in args:
+        parts.append(pyUtils.py2_encode(arg))
+    xbmc.log(pLogger.prefix + pyUtils.py2_encode(message).format(*parts), level=xbmc.LOGDEBUG)
+
+
+def measure(pName, pCount, pFunction):
+    start = time.time()
+    pFunction()
+    elapsed = time.time() - start
+    print('{:<28} {:>8} calls {:>8.4f} sec {:>8.3f} us/call'.format(pName, pCount, elapsed, elapsed * 1000000 / pCount))
+    return elapsed
+
+
+def main(pCount):
+    logger = Logger('plugin.video.ckfwbench', '1.0.0', 'Bench')
+    entry = Params(mode='play', id=1, title='Title 1', channel='ARD', aired=1650000000, duration=1800, image='http://img/1.jpg', url='http://video/1.mp4?' + 'x' * 200)
+    params = tuple(range(20))
+    #
+    def legacy():
+        for _ in range(pCount):
+            legacyDebug(logger, 'addItems {} : {} - {} - {}', entry.mode, entry.id, entry.title, entry.url)
+            legacyDebug(logger, 'query: {} params {}', 'SELECT * FROM film WHERE id IN (?)', params)
+    #
+    def debug():
+        for _ in range(pCount):
+            logger.debug('addItems {} : {} - {} - {}', entry.mode, entry.id, entry.title, entry.url)
+            logger.debug('query: {} params {}', 'SELECT * FROM film WHERE id IN (?)', params)
+    #
+    def guarded():
+        for _ in range(pCount):
+            if logger.isDebugEnabled():
+                logger.debug('addItems {} : {} - {} - {}', entry.mode, entry.id, entry.title, entry.url)
+                logger.debug('query: {} params {}', 'SELECT * FROM film WHERE id IN (?)', params)
+    #
+    for debugLogging in (False, True):
+        xbmc.DEBUG_LOGGING = debugLogging
+        ckfwLogger.refreshLevel()
+        print('debug logging {}'.format('enabled' if debugLogging else 'disabled'))
+        measure('debug legacy', pCount * 2, legacy)
+        measure('debug gated', pCount * 2, debug)
+        measure('isDebugEnabled guard', pCount * 2, guarded)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""
+Offline benchmark suite of the ckfw hot paths against the fake xbmc modules
+
+python benchmarks/bench_suite.py [--filter ui] [--repeat 3] [--output result.json]
+python benchmarks/bench_suite.py --compare baseline.json [--threshold 0.15]
+
+Each case is run `--repeat` times, the fastest run counts. The results
+are written as json (stdout or `--output`). With `--compare` the run is
+checked against an earlier result file and the exit code is 1 if a case
+got slower than the threshold.
+
+The xbmc, xbmcgui, xbmcplugin, xbmcvfs and xbmcaddon modules are replaced
+by the stand-ins in benchmarks/fakekodi. Their module level settings
+(e.g. xbmc.DEBUG_LOGGING, xbmcaddon.SETTINGS) configure the environment.
+
+SPDX-License-Identifier: MIT
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+
+BASE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(BASE, 'fakekodi'), os.path.join(BASE, '..', 'lib')]
+
+try:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+
+import xbmcplugin
+from ckfw import utils as pyUtils
+from ckfw.kodi import Kodi
+from ckfw.kodiUi import KodiUI
+from ckfw.sqliteDB import SqliteDB
+from ckfw.webResource import WebResource
+from ckfw.params import Params
+
+timer = getattr(time, 'perf_counter', time.time)
+
+# (name, function, number of operations, setup function)
+CASES = []
+
+
+def benchmark(pName, pOperations, pSetup=None):
+    """
+    Register a case - the function gets the run context and does `pOperations` operations
+
+    `pSetup(context)` runs once before the timed runs e.g. to start the http server.
+    """
+    def decorator(pFunction):
+        CASES.append((pName, pFunction, pOperations, pSetup))
+        return pFunction
+    return decorator
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # path -> (content encoding, body)
+    documents = {}
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        encoding, body = self.documents.get(self.path, (None, None))
+        if body is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class Context(object):
+    """ Everything the cases share - created once per suite run """
+
+    def __init__(self):
+        # Kodi reads the plugin url, handle and parameters from argv
+        sys.argv = ['plugin://plugin.video.ckfwbench/', '1', '?mode=list']
+        self.addon = Kodi()
+        self.tempDir = tempfile.mkdtemp(prefix='ckfwbench')
+        self.entries = {}
+        self.server = None
+        self.baseUrl = None
+        self.queryDb = None
+
+    def getEntries(self, pCount):
+        if pCount not in self.entries:
+            self.entries[pCount] = [Params(mode='play', id=i, title='Title {}'.format(i), channel='ARD', aired=1650000000 + i * 600, duration=1800, image='http://img/{}.jpg'.format(i), url='http://video/{}.mp4'.format(i)) for i in range(pCount)]
+        return self.entries[pCount]
+
+    def getUrl(self, pPath):
+        if self.server is None:
+            document = json.dumps({'data': {'items': [{'id': i, 'title': 'Title {}'.format(i), 'url': 'http://video/{}.mp4'.format(i), 'aired': 1650000000 + i} for i in range(20000)]}}).encode('utf-8')
+            deflate = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+            gzipped = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+            _Handler.documents = {
+                '/plain': (None, document),
+                '/gzip': ('gzip', gzipped.compress(document) + gzipped.flush()),
+                '/deflate': ('deflate', deflate.compress(document) + deflate.flush())
+            }
+            self.server = _Server(('127.0.0.1', 0), _Handler)
+            serverThread = threading.Thread(target=self.server.serve_forever)
+            serverThread.daemon = True
+            serverThread.start()
+            self.baseUrl = 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+        return self.baseUrl + pPath
+
+    def close(self):
+        if self.queryDb is not None:
+            self.queryDb.exit()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        shutil.rmtree(self.tempDir, ignore_errors=True)
+
+
+######################################
+# KodiUI
+
+def _renderItems(pContext, pCount):
+    xbmcplugin.reset()
+    ui = KodiUI(pContext.addon)
+    ui.addItems(pContext.getEntries(pCount))
+    ui.render()
+
+
+def _streamItems(pContext, pCount):
+    xbmcplugin.reset()
+    ui = KodiUI(pContext.addon)
+    ui.startStreaming(pCount, 500)
+    ui.addItems(pContext.getEntries(pCount))
+    ui.render()
+
+
+for _count in (1000, 10000, 50000):
+    benchmark('ui.addItems+render.{}k'.format(_count // 1000), _count)(lambda pContext, pCount=_count: _renderItems(pContext, pCount))
+benchmark('ui.streaming.10k', 10000)(lambda pContext: _streamItems(pContext, 10000))
+
+
+@benchmark('ui.addListItem.10k', 10000)
+def _addListItem(pContext):
+    xbmcplugin.reset()
+    ui = KodiUI(pContext.addon)
+    for e in pContext.getEntries(10000):
+        ui.addListItem(pTitle=e.title, pUrl=e.url, pPlot=e.title, pDuration=e.duration, pAired=e.aired, pIcon=e.image)
+
+######################################
+# WebResource
+
+
+def _startServer(pContext):
+    pContext.getUrl('/')
+
+
+def _retrieve(pContext, pPath):
+    data = WebResource(pContext.addon, pContext.getUrl(pPath)).retrieveAsString()
+    assert len(data) > 1000000
+
+
+benchmark('web.retrieveAsString.plain', 1, _startServer)(lambda pContext: _retrieve(pContext, '/plain'))
+benchmark('web.retrieveAsString.gzip', 1, _startServer)(lambda pContext: _retrieve(pContext, '/gzip'))
+benchmark('web.retrieveAsString.deflate', 1, _startServer)(lambda pContext: _retrieve(pContext, '/deflate'))
+
+
+@benchmark('web.retrieveAsJsonStream.gzip', 20000, _startServer)
+def _retrieveJsonStream(pContext):
+    itemCnt = sum(1 for _ in WebResource(pContext.addon, pContext.getUrl('/gzip')).retrieveAsJsonStream('data', 'items'))
+    assert itemCnt == 20000
+
+######################################
+# SqliteDB
+
+
+def _createDatabase(pContext, pName):
+    filename = os.path.join(pContext.tempDir, pName)
+    pyUtils.file_remove(filename)
+    db = SqliteDB(pContext.addon, filename, 'bulk-load')
+    db.execute('CREATE TABLE film (id INTEGER PRIMARY KEY, channel TEXT, title TEXT, aired INTEGER, duration INTEGER, url TEXT)')
+    return db
+
+
+def _filmRows(pCount):
+    return ((i, 'ARD' if i % 2 else 'ZDF', 'Title {}'.format(i), 1650000000 + i, 1800, 'http://video/{}.mp4'.format(i)) for i in range(pCount))
+
+
+@benchmark('db.executeMany.100k', 100000)
+def _dbInsert(pContext):
+    db = _createDatabase(pContext, 'insert.db')
+    db.executeMany('INSERT INTO film VALUES (?,?,?,?,?,?)', _filmRows(100000))
+    db.exit()
+
+
+@benchmark('db.executeIterator.100k', 100000, lambda pContext: _getQueryDatabase(pContext))
+def _dbQuery(pContext):
+    db = _getQueryDatabase(pContext)
+    rowCnt = sum(1 for _ in db.executeIterator('SELECT id, channel, title, aired, duration, url FROM film ORDER BY aired DESC'))
+    assert rowCnt == 100000
+
+
+@benchmark('db.execute.point.10k', 10000, lambda pContext: _getQueryDatabase(pContext))
+def _dbPointQuery(pContext):
+    db = _getQueryDatabase(pContext)
+    for i in range(10000):
+        db.execute('SELECT title FROM film WHERE id = ?', (i * 7,))
+
+
+def _getQueryDatabase(pContext):
+    db = pContext.queryDb
+    if db is None:
+        db = pContext.queryDb = _createDatabase(pContext, 'query.db')
+        db.executeMany('INSERT INTO film VALUES (?,?,?,?,?,?)', _filmRows(100000))
+        db.setProfile('read-mostly')
+    return db
+
+######################################
+# utils
+
+
+@benchmark('utils.b64encode+decode.10k', 10000)
+def _b64(pContext):
+    for e in pContext.getEntries(10000):
+        pyUtils.b64decode(pyUtils.b64encode(e.url))
+
+
+@benchmark('utils.extractJsonValue.100k', 100000)
+def _extractJsonValue(pContext):
+    document = {'data': {'items': [{'title': 'x'}]}}
+    for _ in range(100000):
+        pyUtils.extractJsonValue(document, 'data', 'items', 0, 'title')
+
+
+@benchmark('utils.makeDictUnique.10k', 10000)
+def _makeDictUnique(pContext):
+    pyUtils.makeDictUnique([{'name': 'Channel {}'.format(i % 500)} for i in range(10000)])
+
+
+@benchmark('utils.epoch_from_timestamp.10k', 10000)
+def _epochFromTimestamp(pContext):
+    for i in range(10000):
+        pyUtils.epoch_from_timestamp('2022-04-15T10:{:02d}:00.000+0200'.format(i % 60))
+
+######################################
+
+
+def runSuite(pFilter=None, pRepeat=3):
+    context = Context()
+    results = {}
+    try:
+        for name, function, operations, setup in CASES:
+            if pFilter and not any(f in name for f in pFilter):
+                continue
+            if setup is not None:
+                setup(context)
+            times = []
+            for _ in range(pRepeat):
+                start = timer()
+                function(context)
+                times.append(timer() - start)
+            times.sort()
+            results[name] = {
+                'operations': operations,
+                'seconds': round(times[0], 6),
+                'median': round(times[len(times) // 2], 6),
+                'usPerOperation': round(times[0] * 1000000 / operations, 3)
+            }
+            sys.stderr.write('{:<36} {:>10.4f} sec {:>12.3f} us/op\n'.format(name, times[0], results[name]['usPerOperation']))
+    finally:
+        context.close()
+    return {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'revision': _gitRevision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': pRepeat
+        },
+        'results': results
+    }
+
+
+def compareResults(pBaseline, pCurrent, pThreshold):
+    """
+    Print the change per case
+
+    Returns:
+        list: names of the cases which are slower than `pThreshold` (0.15 = 15%)
+    """
+    regressions = []
+    for name, current in sorted(pCurrent['results'].items()):
+        baseline = pBaseline['results'].get(name)
+        if baseline is None or not baseline['usPerOperation']:
+            sys.stderr.write('{:<36} new\n'.format(name))
+            continue
+        change = current['usPerOperation'] / baseline['usPerOperation'] - 1
+        flag = ''
+        if change > pThreshold:
+            flag = 'REGRESSION'
+            regressions.append(name)
+        sys.stderr.write('{:<36} {:>12.3f} -> {:>12.3f} us/op {:>+8.1%} {}\n'.format(name, baseline['usPerOperation'], current['usPerOperation'], change, flag))
+    return regressions
+
+
+def _gitRevision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE, stderr=subprocess.STDOUT).decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def main(pArgs):
+    parser = argparse.ArgumentParser(description='ckfw offline benchmark suite')
+    parser.add_argument('--filter', action='append', help='run cases containing this text (repeatable)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case, the fastest counts')
+    parser.add_argument('--output', help='write the json result to this file instead of stdout')
+    parser.add_argument('--compare', help='json result of an earlier run to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.15, help='allowed slowdown per case for --compare (0.15 = 15%%)')
+    parser.add_argument('--list', action='store_true', help='list the cases and exit')
+    args = parser.parse_args(pArgs)
+    #
+    if args.list:
+        for name, _, operations, _ in CASES:
+            print('{:<36} {:>8} ops'.format(name, operations))
+        return 0
+    result = runSuite(args.filter, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as outputFile:
+            json.dump(result, outputFile, indent=2, sort_keys=True)
+    else:
+        json.dump(result, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+    if args.compare:
+        with open(args.compare) as baselineFile:
+            baseline = json.load(baselineFile)
+        regressions = compareResults(baseline, result, args.threshold)
+        if regressions:
+            sys.stderr.write('{} regression(s): {}\n'.format(len(regressions), ', '.join(regressions)))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Stand-in for the Kodi xbmc module to run ckfw outside of Kodi
+
+SPDX-License-Identifier: MIT
+"""
+LOGDEBUG = 0
+LOGINFO = 1
+LOGWARNING = 2
+LOGERROR = 3
+LOGFATAL = 4
+LOGNONE = 5
+
+# settings of the fake environment
+BUILD_VERSION = '20.2 (20.2.0) Git:20230629-5f418d0b13'
+SKIN = 'skin.estuary'
+DEBUG_LOGGING = False
+# collected log lines (level, message) if not None
+LOG_RECORDS = None
+
+
+def log(msg, level=LOGDEBUG):
+    if LOG_RECORDS is not None:
+        LOG_RECORDS.append((level, msg))
+
+
+def getInfoLabel(infotag):
+    if infotag == 'System.BuildVersion':
+        return BUILD_VERSION
+    return ''
+
+
+def getCondVisibility(condition):
+    if condition == 'System.GetBool(debug.showloginfo)':
+        return DEBUG_LOGGING
+    return False
+
+
+def getSkinDir():
+    return SKIN
+
+
+def executebuiltin(function, wait=False):
+    pass
+
+
+def executeJSONRPC(jsonrpccommand):
+    return '{"id":1,"jsonrpc":"2.0","result":{}}'
+
+
+def sleep(timemillis):
+    pass
+
+
+def translatePath(path):
+    return path
+
+
+class Monitor(object):
+
+    def abortRequested(self):
+        return False
+
+    def waitForAbort(self, timeout=0):
+        return False
+
+
+class Keyboard(object):
+
+    def __init__(self, line='', heading='', hidden=False):
+        self._text = line
+
+    def doModal(self, autoclose=0):
+        pass
+
+    def isConfirmed(self):
+        return True
+
+    def getText(self):
+        return self._text
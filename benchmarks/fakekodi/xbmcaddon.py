@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+Stand-in for the Kodi xbmcaddon module to run ckfw outside of Kodi
+
+SPDX-License-Identifier: MIT
+"""
+import os
+import tempfile
+
+# settings of the fake environment
+ADDON_ID = 'plugin.video.ckfwbench'
+ADDON_VERSION = '1.0.0'
+PROFILE_PATH = os.path.join(tempfile.gettempdir(), ADDON_ID)
+SETTINGS = {}
+STRINGS = {30101: '{}\n'}
+
+
+class Addon(object):
+
+    def __init__(self, id=None):
+        self._info = {
+            'id': id or ADDON_ID,
+            'version': ADDON_VERSION,
+            'profile': PROFILE_PATH,
+            'path': os.path.dirname(os.path.abspath(__file__)),
+            'name': ADDON_ID
+        }
+
+    def getAddonInfo(self, id):
+        return self._info.get(id, '')
+
+    def getSetting(self, id):
+        return SETTINGS.get(id, '')
+
+    def setSetting(self, id, value):
+        SETTINGS[id] = value
+
+    def getLocalizedString(self, id):
+        return STRINGS.get(id, '')
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Stand-in for the Kodi xbmcgui module to run ckfw outside of Kodi
+
+SPDX-License-Identifier: MIT
+"""
+
+
+class InfoTagVideo(object):
+
+    def __init__(self):
+        self.values = {}
+
+
+def _createSetter(pName):
+    def setter(self, value):
+        self.values[pName] = value
+    return setter
+
+
+# setTitle, setPlot, ... store the value like Kodi would
+for _name in ('Title', 'OriginalTitle', 'SortTitle', 'TvShowTitle', 'Plot', 'PlotOutline', 'Duration',
+              'DateAdded', 'FirstAired', 'LastPlayed', 'Premiered', 'Year', 'Genres', 'Studios', 'MediaType'):
+    setattr(InfoTagVideo, 'set' + _name, _createSetter(_name))
+
+
+class ListItem(object):
+
+    def __init__(self, label='', label2='', path='', offscreen=False):
+        self.label = label
+        self.path = path
+        self.info = None
+        self.art = None
+        self.properties = {}
+        self.contextMenu = None
+        self.dateTime = None
+        self.subtitles = None
+        self._videoInfoTag = None
+
+    def setInfo(self, type, infoLabels):
+        self.info = infoLabels
+
+    def getVideoInfoTag(self):
+        if self._videoInfoTag is None:
+            self._videoInfoTag = InfoTagVideo()
+        return self._videoInfoTag
+
+    def setProperty(self, key, value):
+        self.properties[key] = value
+
+    def getProperty(self, key):
+        return self.properties.get(key, '')
+
+    def setArt(self, values):
+        self.art = values
+
+    def addContextMenuItems(self, items):
+        self.contextMenu = items
+
+    def setDateTime(self, dateTime):
+        self.dateTime = dateTime
+
+    def setSubtitles(self, subtitleFiles):
+        self.subtitles = subtitleFiles
+
+    def getLabel(self):
+        return self.label
+
+    def getPath(self):
+        return self.path
+
+
+class DialogProgressBG(object):
+
+    def __init__(self):
+        self.percent = 0
+        self.updateCnt = 0
+
+    def create(self, heading, message=''):
+        pass
+
+    def update(self, percent=0, heading='', message=''):
+        self.percent = percent
+        self.updateCnt += 1
+
+    def close(self):
+        pass
+
+    def isFinished(self):
+        return False
+
+
+class Window(object):
+
+    def __init__(self, existingWindowId=-1):
+        self.windowId = existingWindowId
+
+    def getFocusId(self):
+        return 0
+
+
+def getCurrentWindowId():
+    return 10025
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Stand-in for the Kodi xbmcplugin module to run ckfw outside of Kodi
+
+SPDX-License-Identifier: MIT
+"""
+SORT_METHOD_NONE = 0
+SORT_METHOD_LABEL = 1
+SORT_METHOD_DATE = 3
+SORT_METHOD_SIZE = 4
+SORT_METHOD_DURATION = 8
+SORT_METHOD_TITLE = 9
+SORT_METHOD_DATEADDED = 21
+SORT_METHOD_UNSORTED = 40
+
+# items handed to Kodi - reset with reset()
+DIRECTORY_ITEMS = []
+ADD_CALLS = 0
+
+
+def reset():
+    global DIRECTORY_ITEMS, ADD_CALLS
+    DIRECTORY_ITEMS = []
+    ADD_CALLS = 0
+
+
+def addSortMethod(handle, sortMethod, labelMask='', label2Mask=''):
+    pass
+
+
+def setContent(handle, content):
+    pass
+
+
+def addDirectoryItem(handle, url, listitem, isFolder=False, totalItems=0):
+    global ADD_CALLS
+    ADD_CALLS += 1
+    DIRECTORY_ITEMS.append((url, listitem, isFolder))
+    return True
+
+
+def addDirectoryItems(handle, items, totalItems=0):
+    global ADD_CALLS
+    ADD_CALLS += 1
+    DIRECTORY_ITEMS.extend(items)
+    return True
+
+
+def endOfDirectory(handle, succeeded=True, updateListing=False, cacheToDisc=True):
+    pass
+
+
+def setResolvedUrl(handle, succeeded, listitem):
+    pass
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""
+Stand-in for the Kodi xbmcvfs module to run ckfw outside of Kodi
+
+SPDX-License-Identifier: MIT
+"""
+import os
+
+
+def translatePath(path):
+    return path
+
+
+def exists(path):
+    return os.path.exists(path)
+
+
+def mkdirs(path):
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    return True
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Per host circuit breaker
+SPDX-License-Identifier: MIT
+"""
+
+# pylint: disable=too-many-lines,line-too-long
+import time
+import threading
+#
+from . import utils as pyUtils
+
+
+class CircuitOpenError(IOError):
+    """ Raised instead of a request to a host which failed recently """
+
+
+class CircuitBreaker(object):
+    """
+    Remember failing hosts across plugin invocations
+
+    After `pFailureThreshold` failed requests in a row the circuit of a host
+    opens and requests fail immediately for `pCoolDown` seconds. Afterwards
+    one trial request is let through; success closes the circuit again,
+    failure opens it for another cool down period.
+    The state is stored in a json file in the addon data path.
+
+    """
+
+    def __init__(self, pAddon, pFailureThreshold=3, pCoolDown=300, pStateFile=None):
+        self.addon = pAddon
+        self.logger = pAddon.createLogger('CircuitBreaker')
+        self.failureThreshold = pFailureThreshold
+        self.coolDown = pCoolDown
+        self.stateFile = pStateFile if pStateFile is not None else pyUtils.createPath((pAddon.getAddonDataPath(), 'circuitBreaker.json'))
+        self._state = None
+        self._lock = threading.Lock()
+
+    def allowRequest(self, pHost):
+        """ Check if a request to the host may be sent """
+        with self._lock:
+            hostState = self._getState().get(pHost)
+            if hostState is None or hostState.get('openUntil', 0) == 0:
+                return True
+            if hostState['openUntil'] <= time.time():
+                # half open - let one trial request pass
+                hostState['openUntil'] = time.time() + self.coolDown
+                self._save(pHost)
+                self.logger.debug('circuit half open for {}', pHost)
+                return True
+            return False
+
+    def recordSuccess(self, pHost):
+        with self._lock:
+            if pHost in self._getState():
+                del self._state[pHost]
+                self._save(pHost)
+                self.logger.debug('circuit closed for {}', pHost)
+
+    def recordFailure(self, pHost):
+        with self._lock:
+            hostState = self._getState().setdefault(pHost, {'failures': 0, 'openUntil': 0})
+            hostState['failures'] += 1
+            if hostState['failures'] >= self.failureThreshold:
+                hostState['openUntil'] = time.time() + self.coolDown
+                self.logger.warn('circuit open for {} after {} failure(s) - cool down {} sec', pHost, hostState['failures'], self.coolDown)
+            self._save(pHost)
+
+    #########################################
+
+    def _getState(self):
+        if self._state is None:
+            self._state = self._load()
+        return self._state
+
+    def _load(self):
+        if pyUtils.file_exists(self.stateFile):
+            try:
+                return pyUtils.loadJson(self.stateFile)
+            except Exception as err:
+                self.logger.warn('circuit state unreadable - start empty {}', err)
+        return {}
+
+    def _save(self, pHost):
+        # merge with changes of other invocations for the other hosts
+        state = self._load()
+        if pHost in self._state:
+            state[pHost] = self._state[pHost]
+        else:
+            state.pop(pHost, None)
+        self._state = state
+        tmpFile = self.stateFile + '.tmp'
+        try:
+            pyUtils.saveJson(tmpFile, state)
+            pyUtils.file_rename(tmpFile, self.stateFile)
+        except (IOError, OSError) as err:
+            self.logger.warn('unable to save circuit state {}', err)
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Keep-alive HTTP connection pool shared by all WebResource instances
+SPDX-License-Identifier: MIT
+"""
+
+# pylint: disable=too-many-lines,line-too-long
+import time
+import threading
+#
+try:
+    from http.client import HTTPConnection, HTTPSConnection
+except ImportError:
+    from httplib import HTTPConnection, HTTPSConnection
+#
+from .singleton import Singleton
+
+
+class ConnectionPool(Singleton):
+    """
+    Per host pool of idle keep-alive connections
+
+    The pool is a singleton so every WebResource of one plugin
+    invocation shares the same connections. A connection is handed
+    out exclusively by `acquire` and must be given back with `release`
+    once the response was read completely or dropped with `discard`.
+
+    """
+
+    def __init__(self, pMaxPerHost=4, pIdleTimeout=30):
+        self.maxPerHost = pMaxPerHost
+        self.idleTimeout = pIdleTimeout
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def configure(self, pMaxPerHost=None, pIdleTimeout=None):
+        """
+        Changes the pool limits
+
+        Args:
+            pMaxPerHost(int, optional): number of idle connections kept per host
+
+            pIdleTimeout(int, optional): seconds an idle connection may be reused
+        """
+        if pMaxPerHost is not None:
+            self.maxPerHost = pMaxPerHost
+        if pIdleTimeout is not None:
+            self.idleTimeout = pIdleTimeout
+        self._evict()
+
+    def acquire(self, pScheme, pHost, pPort, pTimeout):
+        """
+        Get a connection for the given host
+
+        Returns:
+            tuple: (key, connection, reused)
+        """
+        key = (pScheme, pHost, pPort)
+        now = time.time()
+        conn = None
+        with self._lock:
+            bucket = self._idle.get(key)
+            while bucket:
+                candidate, lastUsed = bucket.pop()
+                if now - lastUsed < self.idleTimeout:
+                    conn = candidate
+                    break
+                candidate.close()
+        if conn is not None:
+            conn.timeout = pTimeout
+            if conn.sock is not None:
+                conn.sock.settimeout(pTimeout)
+            return (key, conn, True)
+        #
+        if pScheme == 'https':
+            conn = HTTPSConnection(pHost, pPort, timeout=pTimeout)
+        else:
+            conn = HTTPConnection(pHost, pPort, timeout=pTimeout)
+        return (key, conn, False)
+
+    def release(self, pKey, pConnection):
+        """ Give a connection back to the pool for later reuse """
+        with self._lock:
+            bucket = self._idle.setdefault(pKey, [])
+            if len(bucket) < self.maxPerHost:
+                bucket.append((pConnection, time.time()))
+                return
+        pConnection.close()
+
+    def discard(self, pConnection):
+        """ Close a connection which must not be reused """
+        try:
+            pConnection.close()
+        except Exception:
+            pass
+
+    def closeAll(self):
+        """ Close all idle connections """
+        with self._lock:
+            buckets = list(self._idle.values())
+            self._idle = {}
+        for bucket in buckets:
+            for conn, _ in bucket:
+                conn.close()
+
+    def _evict(self):
+        now = time.time()
+        with self._lock:
+            for key in list(self._idle.keys()):
+                bucket = self._idle[key]
+                keep = [e for e in bucket if now - e[1] < self.idleTimeout][-self.maxPerHost:] if self.maxPerHost > 0 else []
+                for e in bucket:
+                    if e not in keep:
+                        e[0].close()
+                if keep:
+                    self._idle[key] = keep
+                else:
+                    del self._idle[key]
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Decoders for the http Content-Encoding
+SPDX-License-Identifier: MIT
+"""
+
+# pylint: disable=too-many-lines,line-too-long
+import zlib
+
+# Content-Encoding -> factory of an object with decompress(data) and flush()
+# in order of preference
+_DECODERS = []
+
+
+def registerDecoder(pEncoding, pFactory):
+    """
+    Add or replace a decoder
+
+    Args:
+        pEncoding(str): the Content-Encoding token e.g. 'br'
+
+        pFactory(function): creates a new decoder object having
+            `decompress(data)` and `flush()`
+    """
+    global _DECODERS
+    _DECODERS = [(pEncoding, pFactory)] + [e for e in _DECODERS if e[0] != pEncoding]
+
+
+def createDecoder(pEncoding):
+    """ New decoder for the Content-Encoding or `None` if it is not supported """
+    if pEncoding:
+        pEncoding = pEncoding.strip().lower()
+        for encoding, factory in _DECODERS:
+            if encoding == pEncoding:
+                return factory()
+    return None
+
+
+def acceptEncoding():
+    """ Value for the Accept-Encoding header - only encodings which can be decoded """
+    return ', '.join(e[0] for e in _DECODERS)
+
+
+#########################################
+
+class _BrotliDecoder(object):
+
+    def __init__(self, pModule):
+        self._decomp = pModule.Decompressor()
+        # brotli uses process, brotlicffi uses decompress
+        self.decompress = getattr(self._decomp, 'process', None) or self._decomp.decompress
+
+    def flush(self):
+        finish = getattr(self._decomp, 'finish', None)
+        if finish is not None:
+            return finish() or b''
+        return b''
+
+
+class _ZstdDecoder(object):
+
+    def __init__(self, pFactory):
+        self._decomp = pFactory()
+        self.decompress = self._decomp.decompress
+
+    def flush(self):
+        flush = getattr(self._decomp, 'flush', None)
+        return flush() if flush is not None else b''
+
+
+registerDecoder('deflate', lambda: zlib.decompressobj(-zlib.MAX_WBITS))
+registerDecoder('gzip', lambda: zlib.decompressobj(16 + zlib.MAX_WBITS))
+
+try:
+    import brotli as _brotli
+    registerDecoder('br', lambda: _BrotliDecoder(_brotli))
+except ImportError:
+    try:
+        import brotlicffi as _brotli
+        registerDecoder('br', lambda: _BrotliDecoder(_brotli))
+    except ImportError:
+        pass
+
+try:
+    import zstandard as _zstd
+    registerDecoder('zstd', lambda: _ZstdDecoder(_zstd.ZstdDecompressor().decompressobj))
+except ImportError:
+    try:
+        from compression import zstd as _zstd
+        registerDecoder('zstd', lambda: _ZstdDecoder(_zstd.ZstdDecompressor))
+    except ImportError:
+        pass
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental json parser
+SPDX-License-Identifier: MIT
+"""
+
+# pylint: disable=too-many-lines,line-too-long
+import re
+import json
+import codecs
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+# characters which end a number - anything else may be the rest of it
+DELIMITERS = ',]} \t\n\r'
+try:
+    NUMBER_TYPES = (int, long, float)
+except NameError:
+    NUMBER_TYPES = (int, float)
+# keep the parsed part of the text buffer until it is bigger than this
+TRIM_SIZE = 65536
+
+
+class JsonStreamParser(object):
+    """
+    Parse a json document chunk by chunk and return the items of one array
+
+    The array is selected with a search path in the style of
+    `utils.extractJsonValue`: strings select object members, integers
+    select list entries. Without a path the items of the top level array
+    are returned. If the path does not point to an array the value itself
+    is returned as the only item. A path which does not exist returns nothing.
+
+    Only the currently parsed item is kept in memory.
+
+    a = JsonStreamParser('data', 'items')
+    a.feed(b'{"data": {"items": [1, 2')
+    list(a.items()) -> [1]
+    a.feed(b', 3]}}')
+    a.close()
+    list(a.items()) -> [2, 3]
+
+    """
+
+    def __init__(self, *args):
+        self.path = list(args)
+        self._textDecoder = codecs.getincrementaldecoder('utf-8')()
+        self._jsonDecoder = json.JSONDecoder()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self._minAvailable = 0
+        # navigation state
+        self._depth = 0
+        self._inContainer = False
+        self._counter = 0
+        self._inTarget = False
+        self._done = False
+
+    def feed(self, pData):
+        """ Add the next chunk of the (decompressed) document """
+        text = self._textDecoder.decode(pData) if isinstance(pData, bytes) else pData
+        if self._pos > TRIM_SIZE:
+            self._buf = self._buf[self._pos:] + text
+            self._pos = 0
+        else:
+            self._buf += text
+
+    def close(self):
+        """ Mark the end of the document """
+        self._buf += self._textDecoder.decode(b'', True)
+        self._eof = True
+
+    def items(self):
+        """ Generator of all items which are complete so far """
+        while not self._done:
+            if self._inTarget:
+                item = self._nextItem()
+            else:
+                item = self._seek()
+            if item is _INCOMPLETE:
+                return
+            if item is not _NOTHING:
+                yield item
+
+    #########################################
+
+    def _seek(self):
+        pos = self._skipWhitespace(self._pos)
+        if pos >= len(self._buf):
+            return self._needMore()
+        char = self._buf[pos]
+        #
+        if not self._inContainer:
+            if self._depth == len(self.path):
+                if char == '[':
+                    self._pos = pos + 1
+                    self._inTarget = True
+                    return _NOTHING
+                value = self._decode(pos)
+                if value is not _INCOMPLETE:
+                    self._done = True
+                return value
+            segment = self.path[self._depth]
+            if (char == '{' and not isinstance(segment, int)) or (char == '[' and isinstance(segment, int)):
+                self._pos = pos + 1
+                self._inContainer = True
+                self._counter = 0
+                return _NOTHING
+            # wrong type - path does not exist
+            self._done = True
+            return _NOTHING
+        #
+        if char in '}]':
+            self._done = True
+            return _NOTHING
+        if char == ',':
+            pos = self._skipWhitespace(pos + 1)
+            if pos >= len(self._buf):
+                return self._needMore()
+        segment = self.path[self._depth]
+        if isinstance(segment, int):
+            found = self._counter == segment
+        else:
+            key = self._decode(pos)
+            if key is _INCOMPLETE:
+                return key
+            pos = self._skipWhitespace(self._end)
+            if pos >= len(self._buf):
+                return self._needMore()
+            if self._buf[pos] != ':':
+                raise ValueError('json stream: expected ":" at {}'.format(pos))
+            pos = self._skipWhitespace(pos + 1)
+            found = key == segment
+        #
+        if found:
+            self._pos = pos
+            self._depth += 1
+            self._inContainer = False
+            return _NOTHING
+        if self._decode(pos) is _INCOMPLETE:
+            return _INCOMPLETE
+        self._pos = self._end
+        self._counter += 1
+        return _NOTHING
+
+    def _nextItem(self):
+        pos = self._skipWhitespace(self._pos)
+        if pos < len(self._buf) and self._buf[pos] == ',':
+            pos = self._skipWhitespace(pos + 1)
+        if pos >= len(self._buf):
+            return self._needMore()
+        if self._buf[pos] == ']':
+            self._done = True
+            return _NOTHING
+        value = self._decode(pos)
+        if value is not _INCOMPLETE:
+            self._pos = self._end
+        return value
+
+    def _decode(self, pPos):
+        """ Decode the value at pPos - `_INCOMPLETE` if more data is needed """
+        if not self._eof and len(self._buf) - pPos < self._minAvailable:
+            return _INCOMPLETE
+        try:
+            value, end = self._jsonDecoder.raw_decode(self._buf, pPos)
+        except ValueError:
+            if self._eof:
+                raise
+            # do not parse a big item again for each chunk
+            self._minAvailable = 2 * (len(self._buf) - pPos)
+            return _INCOMPLETE
+        if not self._eof:
+            if end >= len(self._buf):
+                # a number could continue in the next chunk
+                return _INCOMPLETE
+            if isinstance(value, NUMBER_TYPES) and self._buf[end] not in DELIMITERS:
+                # '2.' or '3e' at the end of the chunk - the number stopped before its fraction or exponent
+                return _INCOMPLETE
+        self._minAvailable = 0
+        self._end = end
+        return value
+
+    def _needMore(self):
+        if self._eof:
+            raise ValueError('json stream: unexpected end of document')
+        return _INCOMPLETE
+
+    def _skipWhitespace(self, pPos):
+        return WHITESPACE.match(self._buf, pPos).end()
+
+
+class _Marker(object):
+    pass
+
+
+_INCOMPLETE = _Marker()
+_NOTHING = _Marker()
@@ -5,6 +5,7 @@ Kodi Interface
 SPDX-License-Identifier: MIT
 """
 import sys
+import atexit
 import xbmc
 import xbmcvfs
 import xbmcgui
@@ -21,8 +22,12 @@ except ImportError:
     
 from .singleton import Singleton
 from .logger import Logger
+from . import logger as ckfwLogger
+from .logSink import LogSink
+from .tracer import Tracer
 from . import utils as pyUtils
 from . import kodiProgressDialog as PG
+from .kodiCapabilities import KodiCapabilities
 
 class Kodi(Singleton):
 
@@ -34,6 +39,8 @@ class Kodi(Singleton):
         self.log = Logger(self._addonClass.getAddonInfo('id'), self._addonClass.getAddonInfo('version'), 'Kodi')
         self._progressDialog = PG.KodiProgressDialog(self)
         self._localizeString = self._addonClass.getLocalizedString
+        self._capabilities = KodiCapabilities()
+        self._traceFormat = 'json'
         # we do store last access for later use
         import time
         self._lastUsed = self.getSetting("LastUsed", 0)
@@ -57,18 +64,25 @@ class Kodi(Singleton):
         return pyUtils.py2_decode(self._addonClass.getAddonInfo('path'))
     
     ## kodi helper
+    def getCapabilities(self):
+        """
+        Get the cached version, skin and feature flags of Kodi
+        Returns:
+            KodiCapabilities: resolved once per process
+        """
+        return self._capabilities
+
     def getKodiVersion(self):
         """
         Get Kodi major version
         Returns:
             int: Kodi major version (e.g. 18)
         """
-        xbmc_version = xbmc.getInfoLabel("System.BuildVersion")
-        return int(xbmc_version.split('-')[0].split('.')[0])
+        return self._capabilities.version
 
     def translatePath(self, pPath):
         path = pyUtils.py2_decode(pPath)
-        if self.getKodiVersion() > 18:
+        if self._capabilities.hasVfsTranslatePath:
             return pyUtils.py2_decode(xbmcvfs.translatePath(path))
         else:
             return pyUtils.py2_decode(xbmc.translatePath(path))
@@ -86,6 +100,84 @@ class Kodi(Singleton):
     def createLogger(self, topic=None):
         return self.log.getInstance(topic)
     
+    def startLogSink(self, pLogFile=False, pMaxRecords=500, pFlushInterval=1.0, pMaxBytes=1048576, pBackupCount=2):
+        """
+        Buffer log records and write them from a background thread
+
+        Args:
+            pLogFile(bool, optional): also write the records to a rotating
+                `<addon data>/addon.log`
+
+            pMaxRecords(int, optional): flush when this many records are waiting
+
+            pFlushInterval(float, optional): flush at least every n seconds
+        """
+        sink = ckfwLogger.getSink()
+        if sink is None:
+            filename = None
+            if pLogFile:
+                dataPath = self.getAddonDataPath()
+                if not pyUtils.dir_exists(dataPath):
+                    xbmcvfs.mkdirs(dataPath)
+                filename = pyUtils.createPath((dataPath, 'addon.log'))
+            sink = LogSink(pMaxRecords, pFlushInterval, filename, pMaxBytes, pBackupCount)
+            sink.start()
+            ckfwLogger.setSink(sink)
+            # the thread is a daemon - deliver the buffer even if the plugin ends without stopLogSink
+            atexit.register(self.stopLogSink)
+        return sink
+
+    def stopLogSink(self):
+        """ Deliver all buffered log records and log directly again """
+        sink = ckfwLogger.getSink()
+        if sink is not None:
+            ckfwLogger.setSink(None)
+            sink.stop()
+
+    def span(self, pName, **kwargs):
+        """ Time the enclosed block as span of the current trace - see `Tracer.span` """
+        return Tracer().span(pName, **kwargs)
+
+    def startTracing(self, pFormat=None, pProfile=None):
+        """
+        Start a trace of this invocation if enabled
+
+        Without arguments the addon settings decide: `trace` (true/false),
+        `traceFormat` (json/chrome) and `traceProfile` (true/false for cProfile).
+
+        Args:
+            pFormat(str, optional): 'json' or 'chrome' - starts the trace regardless of the settings
+
+            pProfile(bool, optional): capture cProfile statistics as well
+
+        Returns:
+            bool: `True` if the trace was started
+        """
+        if pFormat is None:
+            if self.getSetting('trace') != 'true':
+                return False
+            pFormat = self.getSetting('traceFormat') or 'json'
+        if pProfile is None:
+            pProfile = self.getSetting('traceProfile') == 'true'
+        self._traceFormat = pFormat
+        Tracer().start(pProfile)
+        return True
+
+    def stopTracing(self):
+        """
+        Stop the trace and write it to `<addon data>/trace`
+
+        Returns:
+            str: name of the trace file or `None` if no trace was running
+        """
+        tracer = Tracer()
+        if not tracer.enabled:
+            return None
+        tracer.stop()
+        filename = tracer.dump(pyUtils.createPath((self.getAddonDataPath(), 'trace')), self._traceFormat)
+        self.log.info('trace written to {}', filename)
+        return filename
+
     def getProgressDialog(self):
         return self._progressDialog
 
@@ -124,7 +216,7 @@ class Kodi(Singleton):
 
     def playItem(self, pUrl, pSubTitle=None):
 
-        if self.getKodiVersion() > 17:
+        if self._capabilities.supportsOffscreen:
             listitem = xbmcgui.ListItem(path=pUrl, offscreen=True)
         else:
             listitem = xbmcgui.ListItem(path=pUrl)
@@ -138,7 +230,7 @@ class Kodi(Singleton):
 
     ## skin stuff
     def getSkinName(self):
-        return xbmc.getSkinDir();
+        return self._capabilities.skinName
 
     def getCurrentViewId(self):
         window = xbmcgui.Window(xbmcgui.getCurrentWindowId())
@@ -153,6 +245,13 @@ class Kodi(Singleton):
 ###############################################################
 
     def resolveViewId(self, pViewname):
+        viewId = self._capabilities.viewIds.get(pViewname)
+        if viewId is None:
+            viewId = self._resolveViewId(pViewname)
+            self._capabilities.viewIds[pViewname] = viewId
+        return viewId
+
+    def _resolveViewId(self, pViewname):
         skinName = self.getSkinName()
         viewId = -1
         # skin.estuary
@@ -193,7 +292,7 @@ class Kodi(Singleton):
             elif pViewname == viewThump:
                 viewId = 500
         #
-        self.logger.debug('proposed view id {} for {} in mode {}', viewId, skinName, pViewname)
+        self.log.debug('proposed view id {} for {} in mode {}', viewId, skinName, pViewname)
         return viewId;
 
 ##############################################################
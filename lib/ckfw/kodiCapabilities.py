@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+Kodi environment capabilities
+
+SPDX-License-Identifier: MIT
+"""
+import xbmc
+from .singleton import Singleton
+
+
+class KodiCapabilities(Singleton):
+    """
+    Version, skin and feature flags of the running Kodi
+
+    Resolved once per process so hot paths (one call per list item)
+    read plain attributes instead of asking Kodi each time.
+
+    """
+
+    def __init__(self):
+        self.refresh()
+
+    def refresh(self):
+        """ Query Kodi again e.g. after a skin change """
+        buildVersion = xbmc.getInfoLabel("System.BuildVersion")
+        self.version = int(buildVersion.split('-')[0].split('.')[0])
+        self.skinName = xbmc.getSkinDir()
+        # ListItem(offscreen=True) - Kodi 18
+        self.supportsOffscreen = self.version > 17
+        # xbmcvfs.translatePath - Kodi 19
+        self.hasVfsTranslatePath = self.version > 18
+        # ListItem.getVideoInfoTag setters - Kodi 20
+        self.hasInfoTagVideo = self.version > 19
+        # resolved view ids by view name
+        self.viewIds = {}
@@ -4,10 +4,41 @@ Kodi Interface to progress dialog
 
 SPDX-License-Identifier: MIT
 """
+import time
+import threading
 import xbmcgui
 import xbmc
 
 
+class ProgressTask(object):
+    """
+    Progress of one part of the work shown in a `KodiProgressDialog`
+
+    `update` has the signature of a progress listener (done, total) and
+    can be passed to e.g. `WebResource`. It is thread safe.
+    """
+    __slots__ = ('dialog', 'weight', 'fraction')
+
+    def __init__(self, pDialog, pWeight):
+        self.dialog = pDialog
+        self.weight = pWeight
+        self.fraction = 0.0
+
+    def update(self, pDone, pTotal):
+        dialog = self.dialog
+        if dialog.pgdialog is None:
+            return
+        self.fraction = min(1.0, pDone / (pTotal * 1.0)) if pTotal else 0.0
+        if time.time() >= dialog.nextUpdate:
+            dialog._updateTasks()
+
+    def finish(self):
+        """ Mark the task complete and show it at once """
+        self.fraction = 1.0
+        if self.dialog.pgdialog is not None:
+            self.dialog._updateTasks()
+
+
 class KodiProgressDialog(object):
     """ Kodi Progress Dialog Class """
 
@@ -16,6 +47,12 @@ class KodiProgressDialog(object):
         self.logger = pAddon.createLogger('KodiProgressDialog')
         self.pgdialog = None
         self.lastProgress = 0
+        # coalesce updates: at most every minInterval seconds and minStep percent
+        self.minInterval = 0.25
+        self.minStep = 10
+        self.nextUpdate = 0
+        self.tasks = []
+        self.lock = threading.Lock()
 
     def __del__(self):
         self.close()
@@ -39,6 +76,7 @@ class KodiProgressDialog(object):
         else:
             self.pgdialog.update(0, heading, message)
             self.lastProgress = 0
+        self.nextUpdate = 0
 
     def update(self, percent, heading=None, message=None):
         """
@@ -53,23 +91,65 @@ class KodiProgressDialog(object):
             message(str|int): Text of the progress dialog.
                 Can be a string or a numerical id to a localized text.
         """
-        if self.pgdialog is not None:
+        # completion always passes the step gate
+        if self.pgdialog is not None and (self.lastProgress + self.minStep <= percent or (percent >= 100 and self.lastProgress < 100)):
             heading = self._addon.localizeString(heading) if isinstance(heading, int) else heading
             message = self._addon.localizeString(message) if isinstance(message, int) else message
-            if self.lastProgress+9 < percent:
-                self.pgdialog.update(percent, heading, message)
-                self.lastProgress = percent
-                self.logger.debug('update progress {}', percent)
+            self.pgdialog.update(percent, heading, message)
+            self.lastProgress = percent
+            self.logger.debug('update progress {}', percent)
 
     def updateProgress(self, pDone, pTotal):
+        """ Progress listener (done, total) - calls within `minInterval` are dropped """
+        if self.pgdialog is None or not pTotal:
+            return
+        now = time.time()
+        if now < self.nextUpdate and pDone < pTotal:
+            return
+        self.nextUpdate = now + self.minInterval
         self.update( int( (pDone / ( pTotal * 1.0 ) ) * 100 ) )
 
+    def startTask(self, pWeight=1.0):
+        """
+        Add a task to the progress bar
+
+        The bar shows the weighted average of all tasks e.g. parallel
+        downloads with the size as weight. A task started while no
+        unfinished task exists begins a new task set and resets the bar.
+
+        Args:
+            pWeight(float, optional): share of the task in the overall progress
+
+        Returns:
+            ProgressTask: use its `update` as progress listener
+        """
+        task = ProgressTask(self, pWeight)
+        with self.lock:
+            if all(t.fraction >= 1.0 for t in self.tasks):
+                # a new task set - the bar may be at 100 from an earlier download
+                self.tasks = []
+                self.lastProgress = 0
+                self.nextUpdate = 0
+            self.tasks.append(task)
+        return task
+
+    def _updateTasks(self):
+        with self.lock:
+            self.nextUpdate = time.time() + self.minInterval
+            totalWeight = sum(t.weight for t in self.tasks)
+            if totalWeight <= 0:
+                return
+            percent = int(sum(t.weight * t.fraction for t in self.tasks) * 100 / totalWeight)
+            self.update(percent)
+
     def close(self):
         """ Closes a progress dialog """
         if self.pgdialog is not None:
             self.pgdialog.close()
             del self.pgdialog
             self.pgdialog = None
+        with self.lock:
+            self.tasks = []
 
     def startBussyDialog(self):
         self._addon.executebuiltin("ActivateWindow(busydialog)")
@@ -5,20 +5,22 @@ Kodi Interface
 SPDX-License-Identifier: MIT
 """
 import time
+import itertools
 import xbmcplugin
-import xbmcgui
 import xbmc
-import datetime
 from . import utils as pyUtils
+from .listItemBuilder import ListItemBuilder
+from .tracer import traced
 
 class KodiUI(object):
 
     ###########
     #
     ###########
-    def __init__(self, pAddon, pContentType = 'video', pSortMethods = None, pCacheToDisc = False ):
+    def __init__(self, pAddon, pContentType = 'video', pSortMethods = None, pCacheToDisc = False, pListingCache = None ):
         self.addon = pAddon
         self.logger = pAddon.createLogger('KodiUI')
+        self.builder = ListItemBuilder(pAddon)
         #
         self.allSortMethods = [
             xbmcplugin.SORT_METHOD_UNSORTED,
@@ -34,7 +36,14 @@ class KodiUI(object):
         self.cacheToDisc = pCacheToDisc
         self.listItems = []
         self.startTime = 0
-        self.tzBase = datetime.datetime.fromtimestamp(0)
+        # streaming render
+        self.streaming = False
+        self.streamChunkSize = 0
+        self.streamTotalItems = 0
+        self.streamedCnt = 0
+        # listing cache - addListItem arguments of all items
+        self.listingCache = pListingCache
+        self.cacheEntries = [] if pListingCache is not None and pListingCache.isEnabled() else None
         # just for documentation
         self.docuContentTypes = ['','video','movies']
 
@@ -42,23 +51,139 @@ class KodiUI(object):
     
     def addDirectories(self, pDataArray, pmode = None):
         self.logger.debug('addDirectory')
+        debugEnabled = self.logger.isDebugEnabled()
         for e in pDataArray:
-            self.logger.debug('addDirectory {} : {} - {} - {} - {}', (pmode or e.mode), e.id, e.title, e.url, e.image)
+            if debugEnabled:
+                self.logger.debug('addDirectory {} : {} - {} - {} - {}', (pmode or e.mode), e.id, e.title, e.url, e.image)
             tgtUrl = self.addon.generateUrl({
                 'mode': (pmode or e.mode),
                 'urlB64': pyUtils.b64encode(e.url)
             })
             self.addDirectoryItem(pTitle = e.title, pUrl = tgtUrl, pIcon = e.image)
 
+    @traced('KodiUI.addItems')
     def addItems(self, pDataArray, pmode = None):
         self.logger.debug('addItems')
-        for e in pDataArray:
-            self.logger.debug('addItems {} : {} - {} - {} - {} - {} - {} - {}', (pmode or e.mode), e.id, e.title, e.channel, e.aired, e.duration, e.image, e.url)
-            tgtUrl = self.addon.generateUrl({
-                'mode': (pmode or e.mode),
-                'urlB64': pyUtils.b64encode(e.url)
-            })
-            self.addListItem(pTitle = e.title, pUrl = tgtUrl, pPlot = e.title, pDuration = e.duration, pAired = e.aired, pIcon = e.image)
+        entries = iter(pDataArray)
+        debugEnabled = self.logger.isDebugEnabled()
+        # aired dates are formatted in bulk per chunk
+        chunk = list(itertools.islice(entries, 500))
+        while chunk:
+            airedList = self.builder.formatAiredBulk([e.aired for e in chunk])
+            for e, aired in zip(chunk, airedList):
+                if debugEnabled:
+                    self.logger.debug('addItems {} : {} - {} - {} - {} - {} - {} - {}', (pmode or e.mode), e.id, e.title, e.channel, e.aired, e.duration, e.image, e.url)
+                tgtUrl = self.addon.generateUrl({
+                    'mode': (pmode or e.mode),
+                    'urlB64': pyUtils.b64encode(e.url)
+                })
+                self.addListItem(pTitle = e.title, pUrl = tgtUrl, pPlot = e.title, pDuration = e.duration, pAired = aired, pIcon = e.image)
+            chunk = list(itertools.islice(entries, 500))
+
+    def addItemsPage(self, pDataIterator, pPage = None, pPageSize = 100, pmode = None, pNextPageTitle = '>>', pPositioned = False):
+        """
+        Add one page of items and a "next page" folder if there are more
+
+        The iterator (e.g. SqliteDB.executeIterator) is only consumed up to
+        the end of the page plus one entry. The next page folder calls the
+        plugin with the current parameters and `page` increased by one.
+
+        Args:
+            pDataIterator(iterable): entries like for `addItems`
+
+            pPage(int, optional): number of the page starting with 0.
+                Default is the `page` parameter of the plugin url
+
+            pPageSize(int, optional): items per page
+
+            pNextPageTitle(str|int, optional): label of the next page folder
+
+            pPositioned(bool, optional): `True` if the iterator already starts
+                at the page (e.g. sql LIMIT/OFFSET), otherwise the entries of
+                the previous pages are skipped
+        """
+        if pPage is None:
+            try:
+                pPage = max(0, int(self.addon.getParameters('page', 0)))
+            except (TypeError, ValueError):
+                self.logger.warn('invalid page parameter {}', self.addon.getParameters('page'))
+                pPage = 0
+        entries = iter(pDataIterator)
+        if not pPositioned:
+            entries = itertools.islice(entries, pPage * pPageSize, None)
+        pageEntries = list(itertools.islice(entries, pPageSize + 1))
+        hasNext = len(pageEntries) > pPageSize
+        self.addItems(pageEntries[:pPageSize], pmode)
+        if hasNext:
+            params = dict((k, v[0]) for k, v in list(self.addon.getParameters().items()))
+            params['page'] = pPage + 1
+            title = self.addon.localizeString(pNextPageTitle) if isinstance(pNextPageTitle, int) else pNextPageTitle
+            self.addDirectoryItem(pTitle = title, pUrl = self.addon.generateUrl(params))
+        return hasNext
+
+    @traced('KodiUI.restoreFromCache')
+    def restoreFromCache(self):
+        """
+        Add the list items from the listing cache
+
+        Returns:
+            bool: `True` if the listing was restored and only `render` is left to do
+        """
+        if self.cacheEntries is None:
+            return False
+        entries = self.listingCache.load()
+        if entries is None:
+            return False
+        # no need to store again what was just read
+        self.cacheEntries = None
+        for e in entries:
+            if e[7]:
+                e[7] = [tuple(menuItem) for menuItem in e[7]]
+            self.addListItem(*e)
+        return True
+
+    ######################################
+
+    def startStreaming(self, pTotalItems = 0, pChunkSize = 100):
+        """
+        Hand list items to Kodi in chunks while they are built
+
+        Call before adding items. Sort methods and content are set at once
+        and every `pChunkSize` items are passed to Kodi so Python does not
+        hold all list items at the same time. Kodi still shows the directory
+        only after `render` - use `addItemsPage` to show large listings
+        sooner. `render` sends the rest.
+
+        Args:
+            pTotalItems(int, optional): total number of items (e.g. from a
+                count query) for the progress of Kodi. 0 if unknown
+
+            pChunkSize(int, optional): items per addDirectoryItems call
+        """
+        self.streaming = True
+        self.streamChunkSize = pChunkSize
+        self.streamTotalItems = pTotalItems
+        self.streamedCnt = 0
+        if self.startTime == 0:
+            self.startTime = time.time()
+        self._prepareDirectory()
+
+    def _prepareDirectory(self):
+        for method in self.allSortMethods:
+            xbmcplugin.addSortMethod(self.addon.getAddonHandle(), method)
+        #
+        xbmcplugin.setContent(self.addon.getAddonHandle(), self.contentType)
+
+    def _flushItems(self):
+        if not self.listItems:
+            return
+        self.streamedCnt += len(self.listItems)
+        xbmcplugin.addDirectoryItems(
+            handle=self.addon.getAddonHandle(),
+            items=self.listItems,
+            totalItems=max(self.streamTotalItems, self.streamedCnt)
+        )
+        self.listItems = []
 
     ######################################
 
@@ -80,97 +205,38 @@ class KodiUI(object):
         if self.startTime == 0:
             self.startTime = time.time()
         #
-        if self.addon.getKodiVersion() > 17:
-            listItem = xbmcgui.ListItem(label=pTitle, path=pUrl, offscreen=True)
-        else:
-            listItem = xbmcgui.ListItem(label=pTitle, path=pUrl)
-        #
-        if pPlayable == 'True':
-            if self.addon.getKodiVersion() < 20:
-                info_labels = {
-                    'title': pTitle,
-                    'sorttitle': pSortTitle if pSortTitle else pTitle.lower(),
-                    'tvshowtitle': pTitle,
-                    'plot': pPlot if pPlot else ''
-                }
-                #
-                if pDuration:
-                    info_labels['duration'] = '{:02d}:{:02d}:00'.format(*divmod(pDuration, 60))
-                #
-                if pAired:
-                    if type(pAired) in (type(''), type(u'')):
-                        ndate = pAired
-                    else:
-                        ndate = (self.tzBase + datetime.timedelta(seconds=(pAired))).isoformat()
-                    airedstring = ndate.replace('T', ' ')
-                    info_labels['date'] = airedstring[:10]
-                    info_labels['aired'] = airedstring[:10]
-                    info_labels['dateadded'] = airedstring
-                    #
-                    info_labels['plot'] = self.addon.localizeString(30101).format(airedstring) + info_labels['plot']
-                    #
-                # tpye is video to have plot and aired date etc.
-                listItem.setInfo(type='video', infoLabels=info_labels)
-            else:
-                tag = listItem.getVideoInfoTag()
-                tag.setTitle(pTitle)
-                tag.setOriginalTitle(pTitle)
-                tag.setSortTitle(pSortTitle if pSortTitle else pTitle.lower())
-                tag.setTvShowTitle(pTitle)
-                tag.setPlot(pPlot if pPlot else '')
-                #
-                if pDuration:
-                    tag.setDuration(pDuration)
-                #
-                if pAired:
-                    if type(pAired) in (type(''), type(u'')):
-                        ndate = pAired
-                    else:
-                        ndate = (self.tzBase + datetime.timedelta(seconds=(pAired))).isoformat()
-                    airedstring = ndate.replace('T', ' ')
-                    tag.setDateAdded(airedstring) # (YYYY-MM-DD HH:MM:SS)
-                    tag.setFirstAired(airedstring[:10])
-                    tag.setLastPlayed(airedstring) #(YYYY-MM-DD HH:MM:SS)
-                    tag.setPremiered(airedstring[:10])
-                    tag.setYear(int(airedstring[:4]))
-                    listItem.setDateTime(ndate) #YYYY-MM-DDThh:mm[TZD]
-                    tag.setPlot(self.addon.localizeString(30101).format(airedstring) + (pPlot if pPlot else ''))
-                    #
-        #
-        listItem.setProperty('IsPlayable', pPlayable)
+        listItem = self.builder.build(pTitle, pUrl, pSortTitle, pPlot, pDuration, pAired, pIcon, pContextMenu, pPlayable)
         #
-        if pIcon:
-            listItem.setArt({
-                'thumb': pIcon, #video 16:9 960w x 540h / Music 1:1 500w x 500h 
-                'icon': pIcon, #16:9 640w x 360h 
-                'banner': pIcon, #200:37 1000w x 185h 
-                'fanart': pIcon, #16:9 1920w x 1080h
-                'clearart': pIcon, # 16:9  1000w x 562h
-                'clearlogo': pIcon # 80:31 800w x 310h 
-            })
-        #[('title1','action1'),('title2','action2'),...]
-        if pContextMenu:
-            listItem.addContextMenuItems(pContextMenu)
+        if self.cacheEntries is not None:
+            self.cacheEntries.append([pTitle, pUrl, pSortTitle, pPlot, pDuration, pAired, pIcon, pContextMenu, pPlayable, pFolder])
         #
         self.listItems.append((pUrl, listItem, pFolder))
         #
+        if self.streaming and len(self.listItems) >= self.streamChunkSize:
+            self._flushItems()
 
     # add aöö generated list items in one go
+    @traced('KodiUI.render')
     def render(self):
         #
-        for method in self.allSortMethods:
-            xbmcplugin.addSortMethod(self.addon.getAddonHandle(), method)
-        #
-        xbmcplugin.setContent(self.addon.getAddonHandle(), self.contentType)
-        #
-        xbmcplugin.addDirectoryItems(
-            handle=self.addon.getAddonHandle(),
-            items=self.listItems,
-            totalItems=len(self.listItems)
-        )
+        if self.streaming:
+            self._flushItems()
+            itemCnt = self.streamedCnt
+        else:
+            self._prepareDirectory()
+            #
+            xbmcplugin.addDirectoryItems(
+                handle=self.addon.getAddonHandle(),
+                items=self.listItems,
+                totalItems=len(self.listItems)
+            )
+            itemCnt = len(self.listItems)
         #
         xbmcplugin.endOfDirectory(self.addon.getAddonHandle(), cacheToDisc=self.cacheToDisc)
         #
-        self.logger.debug('generated {} item(s) in {} sec', len(self.listItems), round(time.time() - self.startTime, 4))
+        if self.cacheEntries is not None:
+            self.listingCache.store(self.cacheEntries)
+        #
+        self.logger.debug('generated {} item(s) in {} sec', itemCnt, round(time.time() - self.startTime, 4))
 
 
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Kodi ListItem builder
+
+SPDX-License-Identifier: MIT
+"""
+import datetime
+import xbmcgui
+
+ART_KEYS = (
+    'thumb', #video 16:9 960w x 540h / Music 1:1 500w x 500h
+    'icon', #16:9 640w x 360h
+    'banner', #200:37 1000w x 185h
+    'fanart', #16:9 1920w x 1080h
+    'clearart', # 16:9  1000w x 562h
+    'clearlogo' # 80:31 800w x 310h
+)
+
+STRING_TYPES = (type(''), type(u''))
+SECONDS_PER_DAY = 86400
+EPOCH_DATE = datetime.date(1970, 1, 1)
+# 'THH:MM:' for each minute of the day and 'SS' for each second
+MINUTE_STRINGS = ['T%02d:%02d:' % divmod(minute, 60) for minute in range(1440)]
+SECOND_STRINGS = ['%02d' % second for second in range(60)]
+
+
+class ListItemBuilder(object):
+    """
+    Build xbmcgui.ListItem objects for one listing
+
+    Everything which is the same for all items of a listing (version
+    branch, localized aired template, art keys, time zone offset) is
+    resolved once in the constructor. Aired epochs are formatted with
+    integer arithmetic and a per day cache instead of datetime objects.
+
+    """
+
+    def __init__(self, pAddon):
+        self.addon = pAddon
+        capabilities = pAddon.getCapabilities()
+        self.offscreen = capabilities.supportsOffscreen
+        self.infoTagVideo = capabilities.hasInfoTagVideo
+        self.airedTemplate = pAddon.localizeString(30101)
+        # fixed offset of the local time at epoch 0 - like datetime.fromtimestamp(0) + timedelta
+        tzBase = datetime.datetime.fromtimestamp(0) - datetime.datetime(1970, 1, 1)
+        self.tzOffset = tzBase.days * SECONDS_PER_DAY + tzBase.seconds
+        self._days = {}
+
+    def formatAired(self, pAired):
+        """
+        Format an aired epoch as local 'YYYY-MM-DDTHH:MM:SS'
+
+        Strings are returned unchanged.
+        """
+        if type(pAired) in STRING_TYPES:
+            return pAired
+        return self.formatAiredBulk((pAired,))[0]
+
+    def formatAiredBulk(self, pAiredList):
+        """ Format a list of aired epochs - strings and empty values are returned unchanged """
+        days = self._days
+        offset = self.tzOffset
+        rs = []
+        append = rs.append
+        for aired in pAiredList:
+            if type(aired) is not int:
+                if not aired or type(aired) in STRING_TYPES:
+                    append(aired)
+                    continue
+                if type(aired) is not float or not aired.is_integer():
+                    append((datetime.datetime.fromtimestamp(0) + datetime.timedelta(seconds=(aired))).isoformat())
+                    continue
+                aired = int(aired)
+            day, seconds = divmod(aired + offset, SECONDS_PER_DAY)
+            dayString = days.get(day)
+            if dayString is None:
+                dayString = days[day] = (EPOCH_DATE + datetime.timedelta(days=day)).isoformat()
+            append(dayString + MINUTE_STRINGS[seconds // 60] + SECOND_STRINGS[seconds % 60])
+        return rs
+
+    def build(self, pTitle, pUrl, pSortTitle = None, pPlot = None, pDuration = None, pAired = None, pIcon = None, pContextMenu = None, pPlayable = 'True'):
+        """ Build one list item - see KodiUI.addListItem """
+        if self.offscreen:
+            listItem = xbmcgui.ListItem(label=pTitle, path=pUrl, offscreen=True)
+        else:
+            listItem = xbmcgui.ListItem(label=pTitle, path=pUrl)
+        #
+        if pPlayable == 'True':
+            if not self.infoTagVideo:
+                info_labels = {
+                    'title': pTitle,
+                    'sorttitle': pSortTitle if pSortTitle else pTitle.lower(),
+                    'tvshowtitle': pTitle,
+                    'plot': pPlot if pPlot else ''
+                }
+                #
+                if pDuration:
+                    info_labels['duration'] = '{:02d}:{:02d}:00'.format(*divmod(pDuration, 60))
+                #
+                if pAired:
+                    ndate = self.formatAired(pAired)
+                    airedstring = ndate.replace('T', ' ')
+                    info_labels['date'] = airedstring[:10]
+                    info_labels['aired'] = airedstring[:10]
+                    info_labels['dateadded'] = airedstring
+                    #
+                    info_labels['plot'] = self.airedTemplate.format(airedstring) + info_labels['plot']
+                    #
+                # tpye is video to have plot and aired date etc.
+                listItem.setInfo(type='video', infoLabels=info_labels)
+            else:
+                tag = listItem.getVideoInfoTag()
+                tag.setTitle(pTitle)
+                tag.setOriginalTitle(pTitle)
+                tag.setSortTitle(pSortTitle if pSortTitle else pTitle.lower())
+                tag.setTvShowTitle(pTitle)
+                tag.setPlot(pPlot if pPlot else '')
+                #
+                if pDuration:
+                    tag.setDuration(pDuration)
+                #
+                if pAired:
+                    ndate = self.formatAired(pAired)
+                    airedstring = ndate.replace('T', ' ')
+                    tag.setDateAdded(airedstring) # (YYYY-MM-DD HH:MM:SS)
+                    tag.setFirstAired(airedstring[:10])
+                    tag.setLastPlayed(airedstring) #(YYYY-MM-DD HH:MM:SS)
+                    tag.setPremiered(airedstring[:10])
+                    tag.setYear(int(airedstring[:4]))
+                    listItem.setDateTime(ndate) #YYYY-MM-DDThh:mm[TZD]
+                    tag.setPlot(self.airedTemplate.format(airedstring) + (pPlot if pPlot else ''))
+                    #
+        #
+        listItem.setProperty('IsPlayable', pPlayable)
+        #
+        if pIcon:
+            listItem.setArt(dict.fromkeys(ART_KEYS, pIcon))
+        #[('title1','action1'),('title2','action2'),...]
+        if pContextMenu:
+            listItem.addContextMenuItems(pContextMenu)
+        #
+        return listItem
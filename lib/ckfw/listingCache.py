@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Cache of rendered directory listings
+SPDX-License-Identifier: MIT
+"""
+
+# pylint: disable=too-many-lines,line-too-long
+import os
+import sys
+import json
+import time
+import zlib
+import hashlib
+from contextlib import closing
+#
+from . import utils as pyUtils
+
+
+class ListingCache(object):
+    """
+    Store the list items of a directory keyed by the plugin url
+
+    The arguments of each `KodiUI.addListItem` call (title, url, art,
+    info, folder flag...) are stored as compressed json under the addon
+    data path. When the user navigates back to a menu the listing is
+    rebuilt from the cache without fetching or parsing anything.
+    The time to live is configured per `mode` parameter. Each store
+    removes expired listings and the oldest ones above `pMaxSize` bytes.
+
+    """
+
+    def __init__(self, pAddon, pTtlByMode=None, pDefaultTtl=300, pCacheDir=None, pMaxSize=5 * 1024 * 1024):
+        """
+        Args:
+            pTtlByMode(dict, optional): mode -> seconds, 0 disables the cache for a mode
+
+            pDefaultTtl(int, optional): seconds for modes not in `pTtlByMode`
+
+            pMaxSize(int, optional): total bytes of all cached listings
+        """
+        self.addon = pAddon
+        self.logger = pAddon.createLogger('ListingCache')
+        self.cacheDir = pCacheDir if pCacheDir is not None else pyUtils.createPath((pAddon.getAddonDataPath(), 'listcache'))
+        self.ttlByMode = pTtlByMode if pTtlByMode is not None else {}
+        self.defaultTtl = pDefaultTtl
+        self.maxSize = pMaxSize
+
+    def getKey(self):
+        """ key of the current plugin invocation - url and parameters """
+        params = json.dumps(self.addon.getParameters(), sort_keys=True)
+        return hashlib.sha1((sys.argv[0] + params).encode('utf-8')).hexdigest()
+
+    def getTtl(self):
+        """ time to live for the mode of the current invocation """
+        return self.ttlByMode.get(self.addon.getParameters('mode'), self.defaultTtl)
+
+    def isEnabled(self):
+        return self.getTtl() > 0
+
+    def load(self):
+        """
+        Get the cached list items of the current invocation
+
+        Returns:
+            list: addListItem arguments per item or `None` if there is no valid entry
+        """
+        ttl = self.getTtl()
+        if ttl <= 0:
+            return None
+        filename = self._getFilename()
+        try:
+            if time.time() - os.path.getmtime(filename) > ttl:
+                self.logger.debug('listing expired {}', filename)
+                pyUtils.file_remove(filename)
+                return None
+            with closing(open(filename, 'rb')) as cacheFile:
+                entries = json.loads(zlib.decompress(cacheFile.read()).decode('utf-8'))
+        except (IOError, OSError):
+            return None
+        except (ValueError, zlib.error) as err:
+            self.logger.warn('listing cache entry unreadable {} {}', filename, err)
+            pyUtils.file_remove(filename)
+            return None
+        self.logger.debug('listing hit {} item(s) for {}', len(entries), sys.argv[2] if len(sys.argv) > 2 else '')
+        return entries
+
+    def store(self, pEntries):
+        """ Store the list items of the current invocation """
+        if not self.isEnabled():
+            return
+        if not pyUtils.dir_exists(self.cacheDir):
+            os.makedirs(self.cacheDir)
+        filename = self._getFilename()
+        data = zlib.compress(json.dumps(pEntries, separators=(',', ':')).encode('utf-8'), 1)
+        tmpFile = filename + '.tmp'
+        with closing(open(tmpFile, 'wb')) as cacheFile:
+            cacheFile.write(data)
+        pyUtils.file_rename(tmpFile, filename)
+        self.logger.debug('listing stored {} item(s) in {} bytes', len(pEntries), len(data))
+        self._evict()
+
+    def clear(self):
+        """ Remove all cached listings """
+        if pyUtils.dir_exists(self.cacheDir):
+            for name in os.listdir(self.cacheDir):
+                pyUtils.file_remove(pyUtils.createPath((self.cacheDir, name)))
+
+    def _evict(self):
+        """ Remove listings older than the longest time to live and the oldest above the size limit """
+        maxTtl = max([self.defaultTtl] + list(self.ttlByMode.values()))
+        now = time.time()
+        files = []
+        for name in os.listdir(self.cacheDir):
+            filename = pyUtils.createPath((self.cacheDir, name))
+            try:
+                state = os.stat(filename)
+            except OSError:
+                continue
+            if now - state.st_mtime > maxTtl:
+                pyUtils.file_remove(filename)
+            else:
+                files.append((state.st_mtime, state.st_size, filename))
+        total = sum(f[1] for f in files)
+        if total <= self.maxSize:
+            return
+        for _, size, filename in sorted(files):
+            total -= size
+            pyUtils.file_remove(filename)
+            self.logger.debug('listing evict {}', filename)
+            if total <= self.maxSize:
+                break
+
+    def _getFilename(self):
+        return pyUtils.createPath((self.cacheDir, self.getKey() + '.cache'))
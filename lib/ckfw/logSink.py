@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Buffered asynchronous log sink
+SPDX-License-Identifier: MIT
+"""
+
+# pylint: disable=too-many-lines,line-too-long
+import io
+import time
+import threading
+import xbmc
+#
+from . import utils as pyUtils
+
+LEVEL_NAMES = {
+    xbmc.LOGDEBUG: 'DEBUG',
+    xbmc.LOGINFO: 'INFO',
+    xbmc.LOGWARNING: 'WARNING',
+    xbmc.LOGERROR: 'ERROR',
+    xbmc.LOGFATAL: 'FATAL'
+}
+
+
+class LogSink(threading.Thread):
+    """
+    Collect log records in memory and write them from a background thread
+
+    Records are passed to `xbmc.log` (and optionally appended to a log
+    file) when `pMaxRecords` records are waiting or `pFlushInterval`
+    seconds have passed. Records of error level and above are written at
+    once together with everything buffered before them, so the order is kept.
+    The log file is rotated to `.1` ... `.<pBackupCount>` at `pMaxBytes`.
+
+    Install it with `logger.setSink` - see `Kodi.startLogSink`.
+
+    """
+
+    def __init__(self, pMaxRecords=500, pFlushInterval=1.0, pFilename=None, pMaxBytes=1048576, pBackupCount=2, pToKodi=True):
+        super(LogSink, self).__init__(name='LogSink')
+        self.daemon = True
+        self.maxRecords = pMaxRecords
+        self.flushInterval = pFlushInterval
+        self.filename = pFilename
+        self.maxBytes = pMaxBytes
+        self.backupCount = pBackupCount
+        self.toKodi = pToKodi
+        self.records = []
+        self.lock = threading.Lock()
+        # serializes the delivery of swapped out buffers
+        self.writeLock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = False
+        self.logFile = None
+
+    def emit(self, pLevel, pMessage):
+        """ Buffer one formatted record - errors are delivered immediately """
+        with self.lock:
+            self.records.append((time.time(), pLevel, pMessage))
+            pending = len(self.records)
+        if pLevel >= xbmc.LOGERROR or self.stopped:
+            self.flush()
+        elif pending >= self.maxRecords:
+            self.wakeup.set()
+
+    def flush(self):
+        """ Deliver all buffered records """
+        with self.writeLock:
+            with self.lock:
+                records = self.records
+                self.records = []
+            if records:
+                self._write(records)
+
+    def stop(self):
+        """ Deliver the remaining records, end the thread and close the log file """
+        self.stopped = True
+        self.wakeup.set()
+        if self.is_alive():
+            self.join()
+        self.flush()
+        with self.writeLock:
+            if self.logFile is not None:
+                self.logFile.close()
+                self.logFile = None
+
+    def run(self):
+        while not self.stopped:
+            self.wakeup.wait(self.flushInterval)
+            self.wakeup.clear()
+            self.flush()
+
+    def _write(self, pRecords):
+        if self.toKodi:
+            for _, level, message in pRecords:
+                xbmc.log(message, level=level)
+        if self.filename is None:
+            return
+        lines = []
+        for created, level, message in pRecords:
+            lines.append('{}.{:03d} {:<7} {}\n'.format(
+                time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(created)),
+                int((created % 1) * 1000),
+                LEVEL_NAMES.get(level, level),
+                pyUtils.py2_decode(message)))
+        try:
+            if self.logFile is None:
+                self.logFile = io.open(self.filename, 'a', encoding='utf-8')
+            self.logFile.write(''.join(lines))
+            self.logFile.flush()
+            if self.logFile.tell() >= self.maxBytes:
+                self._rotate()
+        except (IOError, OSError) as err:
+            # no Logger here - it would end up in this sink again
+            xbmc.log('LogSink: cannot write {} {}'.format(self.filename, err), level=xbmc.LOGERROR)
+            self.filename = None
+
+    def _rotate(self):
+        self.logFile.close()
+        self.logFile = None
+        for number in range(self.backupCount - 1, 0, -1):
+            source = '{}.{}'.format(self.filename, number)
+            if pyUtils.file_exists(source):
+                pyUtils.file_rename(source, '{}.{}'.format(self.filename, number + 1))
+        if self.backupCount > 0:
+            pyUtils.file_rename(self.filename, self.filename + '.1')
+        else:
+            pyUtils.file_remove(self.filename)
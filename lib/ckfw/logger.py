@@ -5,8 +5,49 @@ The logger module
 
 """
 from . import utils as pyUtils
+from .tracer import Tracer
 import xbmc
 
+# lowest level passed to xbmc.log - resolved once per process
+_minLevel = None
+# optional LogSink which receives all records instead of xbmc.log
+_sink = None
+
+
+def getMinLevel():
+    """
+    Lowest level which is written to the Kodi log
+
+    Debug messages only show up if debug logging is enabled in Kodi.
+    The setting is read once per process - call `refreshLevel` after a change.
+    """
+    global _minLevel
+    if _minLevel is None:
+        refreshLevel()
+    return _minLevel
+
+
+def refreshLevel():
+    """ Read the debug logging setting of Kodi again """
+    global _minLevel
+    _minLevel = xbmc.LOGDEBUG if xbmc.getCondVisibility('System.GetBool(debug.showloginfo)') else xbmc.LOGINFO
+
+
+def setSink(pSink):
+    """
+    Route all records through a sink (e.g. `LogSink`) instead of `xbmc.log`
+
+    Args:
+        pSink(LogSink): object with `emit(level, message)`. `None` restores direct logging
+    """
+    global _sink
+    _sink = pSink
+
+
+def getSink():
+    """ The installed sink or `None` """
+    return _sink
+
 
 class Logger(object):
 
@@ -35,14 +76,47 @@ class Logger(object):
                 If not specified or `None`, the logger will have
                 no topic. Default is `None`
         """
+        self.topic = topic
         if topic is None:
             self.prefix = '[%s-%s]: ' % (self.name, self.version)
         else:
             self.prefix = '[%s-%s:%s]: ' % (self.name, self.version, topic)
 
+    def isEnabledFor(self, level):
+        """
+        Checks if messages of a level are written at all
+
+        Use it to skip building expensive arguments in hot loops.
+
+        Args:
+            level(int): xbmc log level e.g. `xbmc.LOGDEBUG`
+        """
+        return level >= (_minLevel if _minLevel is not None else getMinLevel())
+
+    def isDebugEnabled(self):
+        """ Checks if debug messages are written """
+        return xbmc.LOGDEBUG >= (_minLevel if _minLevel is not None else getMinLevel())
+
+    def span(self, name, **kwargs):
+        """
+        Times the enclosed block as span of the current trace
+
+        The span is named `<topic>.<name>`. See `Tracer.span`.
+
+        Args:
+            name(str): name of the phase e.g. 'render'
+
+            kwargs: attributes of the span e.g. url=...
+        """
+        tracer = Tracer()
+        if not tracer.enabled:
+            return tracer.span(name)
+        return tracer.span(name if self.topic is None else self.topic + '.' + name, **kwargs)
+
     def debug(self, message, *args):
         """ Outputs a debug message """
-        self._log(xbmc.LOGDEBUG, message, *args)
+        if xbmc.LOGDEBUG >= (_minLevel if _minLevel is not None else getMinLevel()):
+            self._log(xbmc.LOGDEBUG, message, *args)
 
     def info(self, message, *args):
         """ Outputs an info message """
@@ -57,10 +131,14 @@ class Logger(object):
         self._log(xbmc.LOGERROR, message, *args)
 
     def _log(self, level, message, *args):
+        # arguments are only converted and formatted for messages which are written
         parts = []
         for arg in args:
             part = arg
             part = pyUtils.py2_encode(part)
             parts.append(part)
         message = pyUtils.py2_encode(message)
-        xbmc.log(self.prefix + message.format(*parts), level=level)
+        if _sink is not None:
+            _sink.emit(level, self.prefix + message.format(*parts))
+        else:
+            xbmc.log(self.prefix + message.format(*parts), level=level)
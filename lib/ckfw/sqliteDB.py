@@ -5,9 +5,127 @@ SPDX-License-Identifier: MIT
 """
 
 # pylint: disable=too-many-lines,line-too-long
+import os
+import re
 import time
 import sqlite3
+import hashlib
+import itertools
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+try:
+    from urllib.request import pathname2url
+except ImportError:
+    from urllib import pathname2url
 from . import utils as pyUtils
+from .params import Params
+from .tracer import Tracer, traced
+
+# durability profiles - pragma name -> value
+PROFILES = {
+    # fast but not crash safe
+    'default': {
+        'journal_mode': 'off',
+        'synchronous': 'off',
+        'cache_size': -2000,
+        'mmap_size': 0,
+        'temp_store': 'default',
+        'busy_timeout': 60000
+    },
+    # importing data - no journal, big cache
+    'bulk-load': {
+        'journal_mode': 'off',
+        'synchronous': 'off',
+        'cache_size': -65536,
+        'mmap_size': 0,
+        'temp_store': 'memory',
+        'busy_timeout': 60000
+    },
+    # browsing - readers do not block on the writer
+    'read-mostly': {
+        'journal_mode': 'wal',
+        'synchronous': 'normal',
+        'cache_size': -16384,
+        'mmap_size': 268435456,
+        'temp_store': 'memory',
+        'busy_timeout': 60000
+    },
+    # survives power loss
+    'safe': {
+        'journal_mode': 'delete',
+        'synchronous': 'full',
+        'cache_size': -2000,
+        'mmap_size': 0,
+        'temp_store': 'default',
+        'busy_timeout': 60000
+    }
+}
+
+PROFILE_PRAGMAS = ('journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'temp_store', 'busy_timeout')
+
+# seconds between checks if the database file was replaced by a rebuild
+SWAP_CHECK_INTERVAL = 1.0
+
+# latency samples kept per statement for the percentile
+STATS_SAMPLES = 1000
+
+# row classes by (type, column names)
+_ROW_CLASSES = {}
+
+
+def _slotsRowInit(self, *values):
+    for name, value in zip(self.__slots__, values):
+        setattr(self, name, value)
+
+
+def rowClass(aColumns, aRowType='namedtuple'):
+    """
+    Get a lightweight class for rows with the given columns
+
+    Args:
+        aColumns(list): the column names
+
+        aRowType(str, optional): 'namedtuple' or 'slots' for a class using `__slots__`
+    """
+    key = (aRowType, tuple(aColumns))
+    rowType = _ROW_CLASSES.get(key)
+    if rowType is None:
+        if aRowType == 'namedtuple':
+            rowType = namedtuple('Row', aColumns, rename=True)
+        elif aRowType == 'slots':
+            rowType = type('Row', (object,), {'__slots__': tuple(aColumns), '__init__': _slotsRowInit})
+        else:
+            raise ValueError('unknown row type {}'.format(aRowType))
+        _ROW_CLASSES[key] = rowType
+    return rowType
+
+
+class StatementStats(object):
+    """ Timing of one sql text """
+    __slots__ = ('count', 'totalTime', 'rows', 'samples', 'explained')
+
+    def __init__(self):
+        self.count = 0
+        self.totalTime = 0.0
+        self.rows = 0
+        self.samples = []
+        self.explained = False
+
+    def add(self, aElapsed, aRows):
+        if len(self.samples) < STATS_SAMPLES:
+            self.samples.append(aElapsed)
+        else:
+            self.samples[self.count % STATS_SAMPLES] = aElapsed
+        self.count += 1
+        self.totalTime += aElapsed
+        self.rows += aRows
+
+    def percentile(self, aPercent):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * aPercent / 100.0))]
 
 
 class SqliteDB(object):
@@ -16,12 +134,28 @@ class SqliteDB(object):
 
     """
 
-    def __init__(self, pAddon, databaseFilename):
+    def __init__(self, pAddon, databaseFilename, pProfile='default', pCachedStatements=256, pSlowQueryThreshold=0.5):
         self.addon = pAddon
         self.logger = self.addon.createLogger('SqliteDB')
         self.databaseFilename = databaseFilename
         self.logger.debug('DB File {}', self.databaseFilename)
         self.conn = None
+        self.transactionDepth = 0
+        self.profile = self._resolveProfile(pProfile)
+        # sqlite3 keeps this many compiled statements per connection
+        self.cachedStatements = pCachedStatements
+        self.slowQueryThreshold = pSlowQueryThreshold
+        self.stats = {}
+        self._fileIdentity = None
+        self._identityChecked = 0
+        # cursors of executePages which are not exhausted - the connection must stay open
+        self._openIterators = 0
+        # single writer mode
+        self.writer = None
+        self._local = threading.local()
+        self._readConnections = []
+        self._statsLock = threading.Lock()
+        self.tracer = Tracer()
 
     def reset(self):
         try:
@@ -30,18 +164,211 @@ class SqliteDB(object):
             pass
         rt = pyUtils.file_remove(self.databaseFilename)
         self.conn = None
+        self.transactionDepth = 0
         self.logger.debug('DB Reset {}', rt)
 
     def getConnection(self):
+        if self.writer is not None:
+            return self._getReadConnection()
+        if self.conn is not None and self.transactionDepth == 0 and time.time() - self._identityChecked > SWAP_CHECK_INTERVAL:
+            self._checkSwap()
         if self.conn is None:
-            self.conn = sqlite3.connect(self.databaseFilename, timeout=60)
-            self.conn.execute('pragma synchronous=off')
-            self.conn.execute('pragma journal_mode=off')
+            self.conn = sqlite3.connect(self.databaseFilename, timeout=60, cached_statements=self.cachedStatements)
             self.conn.execute('pragma page_size=65536')
             self.conn.execute('pragma encoding="UTF-8"')
+            self._applyProfile(self.conn, self.profile)
+            self._fileIdentity = self._getFileIdentity()
+            self._identityChecked = time.time()
         return self.conn
 
+    def _checkSwap(self):
+        """ reconnect if another instance swapped in a rebuilt database - not while statements are open """
+        if self.conn is None or self._openIterators > 0 or self.conn.in_transaction:
+            return
+        self._identityChecked = time.time()
+        if self._getFileIdentity() != self._fileIdentity:
+            self.logger.debug('database file replaced - reconnect')
+            self.conn.close()
+            self.conn = None
+
+    def startWriter(self, aBatchSize=1000):
+        """
+        Switch to single writer mode
+
+        Updates have to be queued with `queueUpdate` or `queueMany`. They
+        are written by a background thread which commits everything
+        waiting in the queue at once. Every thread reads with its own read
+        only connection. The journal mode is switched to WAL so readers
+        do not block the writer. A missing database file is created.
+
+        Args:
+            aBatchSize(int, optional): max queued operations per commit
+        """
+        from .sqliteWriter import SqliteWriter
+        if self.writer is not None:
+            return
+        if str(self.profile.get('journal_mode')).lower() != 'wal':
+            self.setProfile(dict(self.profile, journal_mode='wal', synchronous='normal'))
+        # creates the file - the read only connections can not
+        self.getConnection().commit()
+        self.conn.close()
+        self.conn = None
+        self.writer = SqliteWriter(self, aBatchSize)
+        self.writer.start()
+        self.logger.debug('writer started')
+
+    def queueUpdate(self, aStmt, aParams=None):
+        """ queue an update stmt for the writer thread """
+        self.writer.put('update', aStmt, aParams)
+
+    def queueMany(self, aStmt, aRows):
+        """ queue an update stmt for many rows - aRows is consumed by the writer thread """
+        self.writer.put('many', aStmt, aRows)
+
+    def flushWriter(self):
+        """ wait until all queued updates are committed """
+        if self.writer is not None:
+            self.writer.flush()
+
+    def stopWriter(self):
+        """ commit the queue, stop the writer thread and close the read connections """
+        if self.writer is None:
+            return
+        writer = self.writer
+        self.writer = None
+        for conn in self._readConnections:
+            conn.close()
+        self._readConnections = []
+        self._local = threading.local()
+        writer.stop()
+
+    def _getReadConnection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._openIterators == 0 and not conn.in_transaction and time.time() - self._local.identityChecked > SWAP_CHECK_INTERVAL:
+            self._local.identityChecked = time.time()
+            if self._getFileIdentity() != self._local.fileIdentity:
+                self.logger.debug('database file replaced - reconnect reader')
+                self._readConnections.remove(conn)
+                conn.close()
+                conn = None
+        if conn is None:
+            uri = 'file:{}?mode=ro'.format(pathname2url(os.path.abspath(self.databaseFilename)))
+            # closed by stopWriter from another thread
+            conn = sqlite3.connect(uri, uri=True, timeout=60, cached_statements=self.cachedStatements, check_same_thread=False)
+            self._applyProfile(conn, dict((k, v) for k, v in list(self.profile.items()) if k not in ('journal_mode', 'synchronous')))
+            self._local.conn = conn
+            self._local.fileIdentity = self._getFileIdentity()
+            self._local.identityChecked = time.time()
+            self._readConnections.append(conn)
+        return conn
+
+    @contextmanager
+    def rebuild(self, aProfile='bulk-load'):
+        """
+        Build a new database next to the live one and swap it in
+
+        The block gets a SqliteDB on `<databaseFilename>.shadow` to create
+        and fill. Readers keep using the live database meanwhile. When the
+        block ends the shadow is analyzed, vacuumed and renamed over the
+        live file. On an exception the shadow is deleted and the live
+        database is untouched.
+
+        with db.rebuild() as shadow:
+            shadow.migrate(MIGRATIONS)
+            shadow.executeMany(INSERT, rows)
+
+        Args:
+            aProfile(str|dict, optional): profile of the shadow while it is filled
+        """
+        shadowFilename = self.databaseFilename + '.shadow'
+        # leftover of a crashed rebuild
+        for suffix in ('', '-journal', '-wal', '-shm'):
+            pyUtils.file_remove(shadowFilename + suffix)
+        shadow = SqliteDB(self.addon, shadowFilename, aProfile, self.cachedStatements, self.slowQueryThreshold)
+        start = time.time()
+        try:
+            yield shadow
+            # a single file without wal before the swap
+            shadow.setProfile({'journal_mode': 'delete', 'synchronous': 'full'})
+            conn = shadow.getConnection()
+            conn.execute('ANALYZE')
+            conn.commit()
+            conn.execute('VACUUM')
+            shadow.exit()
+        except BaseException:
+            if shadow.conn is not None:
+                shadow.conn.close()
+                shadow.conn = None
+            pyUtils.file_remove(shadowFilename)
+            self.logger.warn('rebuild failed - keep live database')
+            raise
+        self.logger.info('rebuild filled in {} sec', round(time.time() - start, 4))
+        self._swap(shadowFilename)
+
+    def _swap(self, aShadowFilename):
+        if self.conn is not None:
+            try:
+                self.conn.commit()
+                self.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            except sqlite3.Error:
+                pass
+            self.conn.close()
+            self.conn = None
+        if not pyUtils.file_rename(aShadowFilename, self.databaseFilename):
+            pyUtils.file_remove(aShadowFilename)
+            raise IOError('unable to replace {}'.format(self.databaseFilename))
+        # a wal of the old database must never be applied to the new file
+        for suffix in ('-wal', '-shm'):
+            pyUtils.file_remove(self.databaseFilename + suffix)
+        self.logger.info('database swapped {}', self.databaseFilename)
+
+    def _getFileIdentity(self):
+        try:
+            state = os.stat(self.databaseFilename)
+            # a rename of a rebuilt file changes the inode - a plain write does not
+            return (state.st_dev, state.st_ino)
+        except OSError:
+            return None
+
+    def setProfile(self, aProfile):
+        """
+        Switch the durability profile - also on an open connection
+
+        Args:
+            aProfile(str|dict): name of a profile in `PROFILES`
+                ('default', 'bulk-load', 'read-mostly', 'safe')
+                or a dict of pragma values
+        """
+        if self.transactionDepth > 0:
+            raise sqlite3.ProgrammingError('profile can not be changed inside a transaction')
+        self.profile = self._resolveProfile(aProfile)
+        if self.conn is not None:
+            # journal mode can not be changed within a transaction
+            self.conn.commit()
+            self._applyProfile(self.conn, self.profile)
+
+    def _resolveProfile(self, aProfile):
+        if isinstance(aProfile, dict):
+            profile = dict(PROFILES['default'])
+            profile.update(aProfile)
+            return profile
+        if aProfile not in PROFILES:
+            raise ValueError('unknown sqlite profile {}'.format(aProfile))
+        return PROFILES[aProfile]
+
+    def _applyProfile(self, aConnection, aProfile):
+        for pragma in PROFILE_PRAGMAS:
+            value = aProfile.get(pragma)
+            if value is None:
+                continue
+            rs = aConnection.execute('pragma {}={}'.format(pragma, value)).fetchall()
+            if pragma == 'journal_mode' and rs and str(rs[0][0]).lower() != str(value).lower():
+                self.logger.warn('journal_mode {} requested but {} is active', value, rs[0][0])
+        self.logger.debug('profile {}', aProfile)
+
     def exit(self):
+        self.stopWriter()
+        self.logStatistics()
         if self.conn is not None:
             self.conn.commit()
             self.conn.close()
@@ -58,11 +385,72 @@ class SqliteDB(object):
             cursor.execute(aStmt, aParams)
         rs = cursor.fetchall()
         cursor.close()
-        self.logger.debug('execute: {} rows in {} sec', len(rs), time.time() - start)
+        elapsed = time.time() - start
+        self.logger.debug('execute: {} rows in {} sec', len(rs), elapsed)
+        self._recordStats(aStmt, aParams, elapsed, len(rs))
         return rs
 
+    def executeIterator(self, aStmt, aParams=None, aPageSize=500, aRowType=None):
+        """
+        execute a query and yield the rows one by one
+
+        Only `aPageSize` rows are fetched into memory at a time.
+
+        Args:
+            aStmt(str): the sql query
+
+            aParams(tuple, optional): the query parameters
+
+            aPageSize(int, optional): rows per fetchmany. Default is 500
+
+            aRowType(str|callable, optional): `None` for plain tuples,
+                'namedtuple' or 'slots' for rows with attributes named like
+                the columns or a callable which gets the column values as arguments
+        """
+        for page in self.executePages(aStmt, aParams, aPageSize, aRowType):
+            for row in page:
+                yield row
+
+    def executePages(self, aStmt, aParams=None, aPageSize=500, aRowType=None):
+        """ execute a query and yield lists of up to `aPageSize` rows - see executeIterator """
+        start = time.time()
+        self.logger.debug('query: {} params {}', aStmt, aParams)
+        cursor = self.getConnection().cursor()
+        rowCnt = 0
+        # time spent in sqlite only - not in the consumer of the pages
+        fetchTime = 0
+        self._openIterators += 1
+        try:
+            if aParams is None:
+                cursor.execute(aStmt)
+            else:
+                cursor.execute(aStmt, aParams)
+            if aRowType is None:
+                factory = None
+            elif callable(aRowType):
+                factory = aRowType
+            else:
+                factory = rowClass([column[0] for column in cursor.description], aRowType)
+            #
+            rs = cursor.fetchmany(aPageSize)
+            fetchTime += time.time() - start
+            while rs:
+                rowCnt += len(rs)
+                if factory is not None:
+                    rs = [factory(*row) for row in rs]
+                yield rs
+                fetchStart = time.time()
+                rs = cursor.fetchmany(aPageSize)
+                fetchTime += time.time() - fetchStart
+        finally:
+            self._openIterators -= 1
+            cursor.close()
+            self.logger.debug('executePages: {} rows in {} sec', rowCnt, time.time() - start)
+            self._recordStats(aStmt, aParams, fetchTime, rowCnt)
+
     def executeUpdate(self, aStmt, aParams):
         """ execute a single update stmt and commit """
+        start = time.time()
         cursor = self.getConnection().cursor()
         if aParams is None:
             cursor.execute(aStmt)
@@ -71,9 +459,370 @@ class SqliteDB(object):
         rs = cursor.rowcount
         self.logger.debug(" rowcount executeUpdate {}" , rs)
         cursor.close()
-        self.getConnection().commit()
+        if self.transactionDepth == 0:
+            self.getConnection().commit()
+        self._recordStats(aStmt, aParams, time.time() - start, rs)
         return rs
 
+    def executeMany(self, aStmt, aRows, aBatchSize=1000):
+        """
+        execute an update stmt for each row and commit once per batch
+
+        Args:
+            aStmt(str): the sql statement with parameter placeholders
+
+            aRows(iterable): parameter tuples - a generator is consumed lazily
+
+            aBatchSize(int, optional): rows per commit. Default is 1000
+        """
+        start = time.time()
+        rowIterator = iter(aRows)
+        counter = [0]
+        #
+        def countedRows(rows):
+            for row in rows:
+                counter[0] += 1
+                yield row
+        #
+        cursor = self.getConnection().cursor()
+        try:
+            while True:
+                batchStart = counter[0]
+                cursor.executemany(aStmt, countedRows(itertools.islice(rowIterator, aBatchSize)))
+                if self.transactionDepth == 0:
+                    self.getConnection().commit()
+                if counter[0] - batchStart < aBatchSize:
+                    break
+        finally:
+            cursor.close()
+        total = counter[0]
+        elapsed = time.time() - start
+        self.logger.debug('executeMany: {} rows in {} sec ({} rows/sec)', total, round(elapsed, 4), int(total / elapsed) if elapsed > 0 else total)
+        self._recordStats(aStmt, None, elapsed, total)
+        return total
+
+    def getSchemaVersion(self):
+        """ The schema version stored in `PRAGMA user_version` """
+        return self.getConnection().execute('PRAGMA user_version').fetchone()[0]
+
+    @traced('SqliteDB.migrate')
+    def migrate(self, aMigrations):
+        """
+        Bring the schema to the latest version
+
+        Each migration newer than `PRAGMA user_version` is applied in its own
+        transaction together with the new version number. A failing
+        migration is rolled back and the error is raised.
+
+        Args:
+            aMigrations(list): (version, [ddl stmt, ...]) tuples e.g.
+                [(1, ['CREATE TABLE a (...)']), (2, ['ALTER TABLE a ADD COLUMN b INT', 'CREATE INDEX a_b ON a(b)'])]
+
+        Returns:
+            int: the schema version after the migration
+        """
+        currentVersion = self.getSchemaVersion()
+        for version, stmts in sorted(aMigrations, key=lambda e: e[0]):
+            if version <= currentVersion:
+                continue
+            start = time.time()
+            self._executeDdl(list(stmts) + ['PRAGMA user_version = {}'.format(int(version))])
+            currentVersion = version
+            self.logger.info('schema migrated to version {} in {} sec', version, round(time.time() - start, 4))
+        return currentVersion
+
+    def ensureIndexes(self, aIndexes):
+        """
+        Create declared indexes which are missing
+
+        Args:
+            aIndexes(dict): index name -> (table, [columns]) or (table, [columns], unique)
+
+        Returns:
+            list: names of the created indexes
+        """
+        existing = set(row[0] for row in self.getConnection().execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall())
+        stmts = []
+        created = []
+        for name, definition in sorted(aIndexes.items()):
+            if name in existing:
+                continue
+            table, columns = definition[0], definition[1]
+            unique = 'UNIQUE ' if len(definition) > 2 and definition[2] else ''
+            stmts.append('CREATE {}INDEX IF NOT EXISTS {} ON {} ({})'.format(unique, name, table, ', '.join(columns)))
+            created.append(name)
+        if stmts:
+            start = time.time()
+            self._executeDdl(stmts + ['ANALYZE'])
+            self.logger.info('created index(es) {} in {} sec', created, round(time.time() - start, 4))
+        return created
+
+    @traced('SqliteDB.syncTable')
+    def syncTable(self, aTable, aKeyColumns, aColumns, aRows, aHashColumn='contentHash', aBatchSize=1000):
+        """
+        Apply only the difference between the incoming rows and the table
+
+        A hash of each incoming row is compared with the hash column of the
+        stored row with the same key. New and changed rows are upserted,
+        unchanged rows are skipped and stored rows missing in the input
+        are deleted - all in one transaction.
+        The key columns need a primary key or unique index. Keys are
+        compared as text (a json id '1' matches the stored integer 1) and
+        the deletes are done in sql so the column affinity applies.
+
+        Args:
+            aTable(str): the table to update
+
+            aKeyColumns(list): columns identifying a row
+
+            aColumns(list): columns of the incoming rows incl. the key columns
+
+            aRows(iterable): tuples in the order of `aColumns` - consumed lazily
+
+            aHashColumn(str, optional): text column holding the row hash
+
+            aBatchSize(int, optional): rows per executemany batch
+
+        Returns:
+            Params: inserted, updated, deleted and unchanged counts
+        """
+        start = time.time()
+        keyIdx = [aColumns.index(c) for c in aKeyColumns]
+        singleKey = len(keyIdx) == 1
+        existing = {}
+        for row in self.getConnection().execute('SELECT {}, {} FROM {}'.format(', '.join(aKeyColumns), aHashColumn, aTable)):
+            existing[str(row[0]) if singleKey else tuple(str(v) for v in row[:-1])] = row[-1]
+        #
+        rs = Params(inserted=0, updated=0, deleted=0, unchanged=0)
+        seenKeys = []
+        #
+        def changedRows():
+            for row in aRows:
+                row = tuple(row)
+                # repr is stable for the sqlite value types and much faster than json
+                rowHash = hashlib.md5(repr(row).encode('utf-8')).hexdigest()
+                key = tuple(row[i] for i in keyIdx)
+                seenKeys.append(key)
+                storedHash = existing.pop(str(key[0]) if singleKey else tuple(str(v) for v in key), None)
+                if storedHash == rowHash:
+                    rs.unchanged += 1
+                    continue
+                if storedHash is None:
+                    rs.inserted += 1
+                else:
+                    rs.updated += 1
+                yield row + (rowHash,)
+        #
+        allColumns = list(aColumns) + [aHashColumn]
+        placeholders = ', '.join('?' * len(allColumns))
+        if sqlite3.sqlite_version_info >= (3, 24, 0):
+            upsertStmt = 'INSERT INTO {} ({}) VALUES ({}) ON CONFLICT ({}) DO UPDATE SET {}'.format(
+                aTable, ', '.join(allColumns), placeholders, ', '.join(aKeyColumns),
+                ', '.join('{0} = excluded.{0}'.format(c) for c in allColumns if c not in aKeyColumns))
+        else:
+            upsertStmt = 'INSERT OR REPLACE INTO {} ({}) VALUES ({})'.format(aTable, ', '.join(allColumns), placeholders)
+        # the seen keys get the declared types of the table so sqlite converts them like the stored keys
+        columnTypes = dict((row[1], row[2]) for row in self.getConnection().execute('PRAGMA table_info({})'.format(aTable)))
+        createKeysStmt = 'CREATE TEMP TABLE syncKeys ({}, PRIMARY KEY ({}))'.format(
+            ', '.join('{} {}'.format(c, columnTypes.get(c, '')) for c in aKeyColumns), ', '.join(aKeyColumns))
+        insertKeysStmt = 'INSERT OR IGNORE INTO temp.syncKeys VALUES ({})'.format(', '.join('?' * len(aKeyColumns)))
+        deleteStmt = 'DELETE FROM {0} WHERE NOT EXISTS (SELECT 1 FROM temp.syncKeys k WHERE {1})'.format(
+            aTable, ' AND '.join('k.{0} = {1}.{0}'.format(c, aTable) for c in aKeyColumns))
+        #
+        with self.transaction():
+            self.executeMany(upsertStmt, changedRows(), aBatchSize)
+            conn = self.getConnection()
+            conn.execute('DROP TABLE IF EXISTS temp.syncKeys')
+            conn.execute(createKeysStmt)
+            try:
+                self.executeMany(insertKeysStmt, seenKeys, aBatchSize)
+                rs.deleted = self.executeUpdate(deleteStmt, None)
+            finally:
+                conn.execute('DROP TABLE IF EXISTS temp.syncKeys')
+        self.logger.info('sync {}: {} inserted {} updated {} deleted {} unchanged in {} sec', aTable, rs.inserted, rs.updated, rs.deleted, rs.unchanged, round(time.time() - start, 4))
+        return rs
+
+    def hasFullTextSupport(self):
+        """ Check if the sqlite library is compiled with FTS5 """
+        try:
+            self.getConnection().execute('CREATE VIRTUAL TABLE temp.ckfw_fts5_probe USING fts5(x)')
+            self.getConnection().execute('DROP TABLE temp.ckfw_fts5_probe')
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    @traced('SqliteDB.createFullTextIndex')
+    def createFullTextIndex(self, aFtsTable, aContentTable, aColumns, aContentRowid='rowid'):
+        """
+        Create a FTS5 index mirroring columns of a content table
+
+        The index is an external content table kept in sync by triggers
+        on insert, update and delete. It is filled once on creation.
+
+        Args:
+            aFtsTable(str): name of the virtual table
+
+            aContentTable(str): table holding the data
+
+            aColumns(list): text columns to index
+
+            aContentRowid(str, optional): integer primary key of the content table
+
+        Returns:
+            bool: `True` if the index was created, `False` if it already existed
+        """
+        if self.getConnection().execute("SELECT 1 FROM sqlite_master WHERE name = ?", (aFtsTable,)).fetchall():
+            return False
+        cols = ', '.join(aColumns)
+        newCols = ', '.join('new.' + c for c in aColumns)
+        oldCols = ', '.join('old.' + c for c in aColumns)
+        fmt = {'fts': aFtsTable, 'table': aContentTable, 'rowid': aContentRowid, 'cols': cols, 'new': newCols, 'old': oldCols}
+        start = time.time()
+        self._executeDdl([
+            "CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{table}', content_rowid='{rowid}')".format(**fmt),
+            "CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+            "INSERT INTO {fts}(rowid, {cols}) VALUES (new.{rowid}, {new}); END".format(**fmt),
+            "CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+            "INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.{rowid}, {old}); END".format(**fmt),
+            "CREATE TRIGGER {fts}_au AFTER UPDATE ON {table} BEGIN "
+            "INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.{rowid}, {old}); "
+            "INSERT INTO {fts}(rowid, {cols}) VALUES (new.{rowid}, {new}); END".format(**fmt),
+            "INSERT INTO {fts}({fts}) VALUES ('rebuild')".format(**fmt)
+        ])
+        self.logger.info('full text index {} on {} ({}) in {} sec', aFtsTable, aContentTable, cols, round(time.time() - start, 4))
+        return True
+
+    def searchFullText(self, aFtsTable, aContentTable, aTerm, aLimit=100, aSnippetColumn=-1, aContentRowid='rowid', aRowType=None):
+        """
+        Ranked prefix search in a full text index
+
+        Every word of the term has to match as prefix. The rows of the
+        content table are returned best match first with an additional
+        `snippet` column where the matches are marked bold.
+
+        Args:
+            aFtsTable(str): name of the virtual table
+
+            aContentTable(str): table holding the data
+
+            aTerm(str): the text entered by the user
+
+            aLimit(int, optional): max number of rows. Default is 100
+
+            aSnippetColumn(int, optional): index of the indexed column for
+                the snippet, -1 selects the best matching column
+
+            aContentRowid(str, optional): integer primary key of the content table
+
+            aRowType(str|callable, optional): see executeIterator
+        """
+        words = re.findall(r'\w+', pyUtils.py2_decode(aTerm), re.UNICODE)
+        if not words:
+            return []
+        match = ' '.join('"{}"*'.format(w) for w in words)
+        stmt = ("SELECT c.*, snippet({fts}, {col}, '[B]', '[/B]', '...', 12) AS snippet "
+                "FROM {fts} JOIN {table} c ON c.{rowid} = {fts}.rowid "
+                "WHERE {fts} MATCH ? ORDER BY rank LIMIT ?").format(fts=aFtsTable, table=aContentTable, rowid=aContentRowid, col=int(aSnippetColumn))
+        return list(self.executeIterator(stmt, (match, aLimit), aRowType=aRowType))
+
+    def _executeDdl(self, aStmts):
+        """ run ddl statements in one explicit transaction """
+        if self.transactionDepth > 0:
+            raise sqlite3.ProgrammingError('ddl can not run inside a transaction')
+        conn = self.getConnection()
+        conn.commit()
+        isolationLevel = conn.isolation_level
+        # no implicit transaction handling of the sqlite3 module
+        conn.isolation_level = None
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for stmt in aStmts:
+                    self.logger.debug('ddl: {}', stmt)
+                    conn.execute(stmt)
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        finally:
+            conn.isolation_level = isolationLevel
+
+    def getStatistics(self):
+        """
+        Timing per sql text ordered by total time
+
+        Returns:
+            list: dicts with sql, count, total, avg, p95 and rows
+        """
+        rs = []
+        for stmt, stats in list(self.stats.items()):
+            rs.append({
+                'sql': stmt,
+                'count': stats.count,
+                'total': stats.totalTime,
+                'avg': stats.totalTime / stats.count if stats.count else 0.0,
+                'p95': stats.percentile(95),
+                'rows': stats.rows
+            })
+        return sorted(rs, key=lambda e: e['total'], reverse=True)
+
+    def logStatistics(self):
+        """ Dump the statement timing to the log """
+        for e in self.getStatistics():
+            self.logger.debug('stats: {}x total {} sec avg {} sec p95 {} sec {} rows - {}', e['count'], round(e['total'], 4), round(e['avg'], 4), round(e['p95'], 4), e['rows'], ' '.join(e['sql'].split()))
+
+    def _recordStats(self, aStmt, aParams, aElapsed, aRows):
+        if self.tracer.enabled:
+            self.tracer.record('SqliteDB.query', time.time() - aElapsed, aElapsed, sql=' '.join(aStmt.split())[:200], rows=aRows)
+        with self._statsLock:
+            stats = self.stats.get(aStmt)
+            if stats is None:
+                stats = self.stats[aStmt] = StatementStats()
+            stats.add(aElapsed, aRows if aRows > 0 else 0)
+            explain = aElapsed > self.slowQueryThreshold and not stats.explained
+            stats.explained = stats.explained or explain
+        if explain:
+            self._explain(aStmt, aParams, aElapsed)
+
+    def _explain(self, aStmt, aParams, aElapsed):
+        try:
+            plan = self.getConnection().execute('EXPLAIN QUERY PLAN ' + aStmt, aParams if aParams is not None else ()).fetchall()
+        except sqlite3.Error as err:
+            self.logger.debug('slow query ({} sec) without plan {} - {}', round(aElapsed, 4), err, aStmt)
+            return
+        self.logger.info('slow query ({} sec): {}', round(aElapsed, 4), ' '.join(aStmt.split()))
+        for row in plan:
+            self.logger.info('  plan: {}', row[-1])
+
+    @contextmanager
+    def transaction(self):
+        """
+        Group updates in one transaction
+
+        executeUpdate and executeMany do not commit inside the block.
+        The block is committed at the end or rolled back on an exception.
+        Nested blocks join the outer transaction. The outermost block
+        first checks if another instance swapped in a rebuilt database so
+        the writes do not end up in the replaced file.
+        A reliable rollback needs a journal i.e. not the profiles
+        'default' or 'bulk-load'.
+        """
+        if self.transactionDepth == 0 and self.writer is None:
+            self._checkSwap()
+        self.transactionDepth += 1
+        try:
+            yield self
+        except BaseException:
+            self.transactionDepth -= 1
+            if self.transactionDepth == 0:
+                self.getConnection().rollback()
+                self.logger.debug('transaction rolled back')
+            raise
+        else:
+            self.transactionDepth -= 1
+            if self.transactionDepth == 0:
+                self.getConnection().commit()
+
 '''
     def isInitialized(self):
         rt = False
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Background writer thread for SqliteDB
+SPDX-License-Identifier: MIT
+"""
+
+# pylint: disable=too-many-lines,line-too-long
+import time
+import threading
+#
+try:
+    from queue import Queue, Empty
+except ImportError:
+    from Queue import Queue, Empty
+
+_STOP = object()
+
+
+class SqliteWriter(threading.Thread):
+    """
+    Single writer thread with its own connection
+
+    Queued updates are applied in the order they were queued. Everything
+    waiting in the queue is grouped into one transaction (up to
+    `pBatchSize` operations) so many small writes share one commit.
+    If the group fails its updates are retried one by one. Bulk
+    operations from `queueMany` are committed on their own.
+    The first error is kept and raised by `flush` and `stop`.
+
+    """
+
+    def __init__(self, pDatabase, pBatchSize=1000):
+        super(SqliteWriter, self).__init__(name='SqliteWriter')
+        self.daemon = True
+        self.database = pDatabase
+        self.logger = pDatabase.addon.createLogger('SqliteWriter')
+        self.batchSize = pBatchSize
+        self.queue = Queue()
+        self.error = None
+        self.commitCnt = 0
+        self.operationCnt = 0
+
+    def put(self, pOperation, pStmt, pParams):
+        if not self.is_alive():
+            raise RuntimeError('sqlite writer is not running')
+        self.queue.put((pOperation, pStmt, pParams))
+
+    def flush(self):
+        """ Wait until everything queued so far is committed """
+        self.queue.join()
+        self._raiseError()
+
+    def stop(self):
+        """ Commit the remaining queue and end the thread """
+        if self.is_alive():
+            self.queue.put(_STOP)
+            self.join()
+        self.logger.debug('writer stopped after {} operation(s) in {} commit(s)', self.operationCnt, self.commitCnt)
+        self._raiseError()
+
+    def run(self):
+        # a private instance - the connection belongs to this thread
+        db = self.database.__class__(self.database.addon, self.database.databaseFilename, self.database.profile, self.database.cachedStatements, self.database.slowQueryThreshold)
+        try:
+            running = True
+            while running:
+                batch = [self.queue.get()]
+                while len(batch) < self.batchSize:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except Empty:
+                        break
+                if batch[-1] is _STOP:
+                    running = False
+                self._apply(db, [e for e in batch if e is not _STOP])
+                for _ in batch:
+                    self.queue.task_done()
+        finally:
+            db.exit()
+
+    def _apply(self, pDb, pBatch):
+        # a bulk operation is a transaction of its own - its rows can not be replayed
+        group = []
+        for operation in pBatch:
+            if operation[0] == 'many':
+                self._commit(pDb, group)
+                self._commit(pDb, [operation])
+                group = []
+            else:
+                group.append(operation)
+        self._commit(pDb, group)
+
+    def _commit(self, pDb, pGroup):
+        if not pGroup:
+            return
+        start = time.time()
+        try:
+            with pDb.transaction():
+                for operation, stmt, params in pGroup:
+                    if operation == 'many':
+                        pDb.executeMany(stmt, params)
+                    else:
+                        pDb.executeUpdate(stmt, params)
+            self.commitCnt += 1
+            self.operationCnt += len(pGroup)
+            self.logger.debug('committed {} operation(s) in {} sec', len(pGroup), round(time.time() - start, 4))
+        except Exception as err:
+            if len(pGroup) == 1:
+                self.logger.error('write failed: {}', err)
+                if self.error is None:
+                    self.error = err
+                return
+            # do not lose the other updates of the group because of one bad one
+            self.logger.warn('group commit of {} operation(s) failed - apply one by one: {}', len(pGroup), err)
+            for operation in pGroup:
+                self._commit(pDb, [operation])
+
+    def _raiseError(self):
+        if self.error is not None:
+            err = self.error
+            self.error = None
+            raise err
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+Timing spans of one plugin invocation
+SPDX-License-Identifier: MIT
+"""
+
+# pylint: disable=too-many-lines,line-too-long
+import os
+import json
+import time
+import functools
+import threading
+from contextlib import closing
+#
+from .singleton import Singleton
+from . import utils as pyUtils
+
+# number of trace files kept in the trace directory
+MAX_TRACE_FILES = 20
+
+
+class Span(object):
+    """ One timed phase with its nested phases """
+    __slots__ = ('name', 'start', 'end', 'args', 'children', 'thread')
+
+    def __init__(self, pName, pStart, pArgs, pThread):
+        self.name = pName
+        self.start = pStart
+        self.end = None
+        self.args = pArgs
+        self.children = []
+        self.thread = pThread
+
+    def set(self, **kwargs):
+        """ Add attributes e.g. row counts once they are known """
+        self.args.update(kwargs)
+
+    def toDict(self, pOrigin):
+        return {
+            'name': self.name,
+            'start': round((self.start - pOrigin) * 1000, 3),
+            'duration': round(((self.end or time.time()) - self.start) * 1000, 3),
+            'thread': self.thread,
+            'args': self.args,
+            'children': [child.toDict(pOrigin) for child in self.children]
+        }
+
+
+class _NullSpan(object):
+    """ Returned while tracing is off - does nothing """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, pType, pValue, pTraceback):
+        return False
+
+    def set(self, **kwargs):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _SpanContext(object):
+
+    def __init__(self, pTracer, pName, pArgs):
+        self.tracer = pTracer
+        self.name = pName
+        self.args = pArgs
+        self.span = None
+
+    def __enter__(self):
+        self.span = self.tracer._open(self.name, self.args)
+        return self.span
+
+    def __exit__(self, pType, pValue, pTraceback):
+        if pType is not None:
+            self.span.args['error'] = '{}: {}'.format(pType.__name__, pValue)
+        self.tracer._close(self.span)
+        return False
+
+
+class Tracer(Singleton):
+    """
+    Collect a tree of timing spans for the current invocation
+
+    Spans nest per thread. A span opened by a thread without an open
+    span (e.g. a worker of WebBatchResource) starts a new root. While
+    tracing is off `span` returns a shared no-op object so instrumented
+    code pays only for one attribute check.
+
+    with Tracer().span('import', source='film.json') as span:
+        ...
+        span.set(rows=rowCnt)
+
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.origin = 0
+        self.roots = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.profiler = None
+
+    def start(self, pProfile=False):
+        """
+        Start collecting spans
+
+        Args:
+            pProfile(bool, optional): also run cProfile until `stop`
+        """
+        with self.lock:
+            self.roots = []
+        self.local = threading.local()
+        self.origin = time.time()
+        self.enabled = True
+        if pProfile:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop(self):
+        """ Stop collecting spans - the collected tree is kept for `dump` """
+        self.enabled = False
+        if self.profiler is not None:
+            self.profiler.disable()
+
+    def span(self, pName, **kwargs):
+        """ Context manager timing the enclosed block """
+        if not self.enabled:
+            return NULL_SPAN
+        return _SpanContext(self, pName, kwargs)
+
+    def record(self, pName, pStart, pDuration, **kwargs):
+        """
+        Add a finished span below the current span
+
+        For phases measured in pieces e.g. the decompression of all chunks
+        of a download or code which can not be enclosed (generators).
+        """
+        if not self.enabled:
+            return
+        span = Span(pName, pStart, kwargs, threading.current_thread().name)
+        span.end = pStart + pDuration
+        stack = self._stack()
+        if stack:
+            stack[-1].children.append(span)
+        else:
+            with self.lock:
+                self.roots.append(span)
+
+    def traced(self, pName=None):
+        """ Decorator - see `traced` """
+        return traced(pName)
+
+    def toTree(self):
+        """ The collected spans as list of nested dicts (milliseconds since start) """
+        with self.lock:
+            roots = list(self.roots)
+        return [root.toDict(self.origin) for root in roots]
+
+    def toChromeTrace(self):
+        """ The collected spans in the Chrome trace event format (chrome://tracing, Perfetto) """
+        events = []
+        threadIds = {}
+        pending = self.toTree()
+        while pending:
+            span = pending.pop()
+            tid = threadIds.setdefault(span['thread'], len(threadIds) + 1)
+            events.append({
+                'name': span['name'],
+                'ph': 'X',
+                'ts': int(span['start'] * 1000),
+                'dur': int(span['duration'] * 1000),
+                'pid': 1,
+                'tid': tid,
+                'args': span['args']
+            })
+            pending.extend(span['children'])
+        for name, tid in threadIds.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': name}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def dump(self, pDirectory, pFormat='json'):
+        """
+        Write the trace (and the cProfile statistics) to a new file
+
+        Args:
+            pDirectory(str): target directory e.g. `<addon data>/trace`
+
+            pFormat(str, optional): 'json' for the span tree, 'chrome' for trace events
+
+        Returns:
+            str: name of the trace file
+        """
+        if not pyUtils.dir_exists(pDirectory):
+            os.makedirs(pDirectory)
+        baseName = pyUtils.createPath((pDirectory, time.strftime('trace-%Y%m%d-%H%M%S-', time.localtime(self.origin)) + str(os.getpid())))
+        if pFormat == 'chrome':
+            data = self.toChromeTrace()
+        else:
+            data = {'start': self.origin, 'spans': self.toTree()}
+        filename = baseName + '.json'
+        with closing(open(filename, 'w')) as traceFile:
+            json.dump(data, traceFile, separators=(',', ':'), default=str)
+        if self.profiler is not None:
+            self.profiler.dump_stats(baseName + '.prof')
+            self.profiler = None
+        self._cleanup(pDirectory)
+        return filename
+
+    #########################################
+
+    def _stack(self):
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def _open(self, pName, pArgs):
+        span = Span(pName, time.time(), pArgs, threading.current_thread().name)
+        stack = self._stack()
+        if stack:
+            stack[-1].children.append(span)
+        else:
+            with self.lock:
+                self.roots.append(span)
+        stack.append(span)
+        return span
+
+    def _close(self, pSpan):
+        pSpan.end = time.time()
+        stack = self._stack()
+        if stack and stack[-1] is pSpan:
+            stack.pop()
+        elif pSpan in stack:
+            # spans closed out of order (e.g. an abandoned generator)
+            del stack[stack.index(pSpan):]
+
+    def _cleanup(self, pDirectory):
+        traceFiles = sorted(name for name in os.listdir(pDirectory) if name.startswith('trace-'))
+        for name in traceFiles[:-MAX_TRACE_FILES * 2]:
+            pyUtils.file_remove(pyUtils.createPath((pDirectory, name)))
+
+
+def traced(pName=None):
+    """
+    Decorator timing each call of a function as a span
+
+    Args:
+        pName(str, optional): span name. Default is the qualified function name
+    """
+    def decorator(pFunction):
+        name = pName or getattr(pFunction, '__qualname__', pFunction.__name__)
+
+        @functools.wraps(pFunction)
+        def wrapper(*args, **kwargs):
+            tracer = Tracer()
+            if not tracer.enabled:
+                return pFunction(*args, **kwargs)
+            with _SpanContext(tracer, name, {}):
+                return pFunction(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -352,7 +352,7 @@ def _chunked_url_copier(src, dst, reporthook, chunk_size, aborthook):
         if not byteStringchunk:
             # operation has finished
             return
-        dst.write(bytearray(byteStringchunk))
+        dst.write(byteStringchunk)
         total_chunks += 1
     # abort requested
     raise Exception('Reception interrupted.')
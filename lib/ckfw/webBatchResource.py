@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Concurrent download of several urls
+SPDX-License-Identifier: MIT
+"""
+
+# pylint: disable=too-many-lines,line-too-long
+import time
+import threading
+#
+try:
+    from queue import Queue, Empty
+except ImportError:
+    from Queue import Queue, Empty
+#
+from .webResource import WebResource
+from .params import Params
+from .tracer import traced
+
+
+class WebBatchResource(object):
+    """
+    Download a list of urls with a bounded number of worker threads
+
+    The result is a list in the order of the input urls. Each entry has
+    the attributes `url`, `data` and `error`. A failed download has `data`
+    set to `None` and the exception in `error` so one broken feed does
+    not fail the whole batch.
+
+    """
+
+    def __init__(self, pAddon, pUrls, pHeader = None, pMaxWorkers=4, pChunkSize=8192, pTimeout=10, pCache=None, pRetries=0, pCircuitBreaker=None):
+        self.addon = pAddon
+        self.logger = pAddon.createLogger('WebBatchResource')
+        self.abortHook = pAddon.getAbortHook()
+        self.progressDialog = pAddon.getProgressDialog()
+        #
+        self.urls = list(pUrls)
+        self.header = pHeader
+        self.maxWorkers = max(1, min(pMaxWorkers, len(self.urls)))
+        self.chunkSize = pChunkSize
+        self.connectionTimeout = pTimeout
+        self.cache = pCache
+        self.retries = pRetries
+        self.circuitBreaker = pCircuitBreaker
+        #
+        self._cancelled = threading.Event()
+
+    @traced('WebBatchResource.retrieveAsString')
+    def retrieveAsString(self):
+        """
+        Download all urls
+
+        Returns:
+            list: one `Params` (url, data, error) per input url
+        """
+        startTime = time.time()
+        results = [Params(url=url, data=None, error=None) for url in self.urls]
+        if not self.urls:
+            return results
+        #
+        todo = Queue()
+        for idx in range(len(self.urls)):
+            todo.put(idx)
+        done = Queue()
+        # one share of the progress bar per url - updated while downloading
+        tasks = [self.progressDialog.startTask() for _ in self.urls]
+        #
+        workers = []
+        for _ in range(self.maxWorkers):
+            worker = threading.Thread(target=self._worker, args=(todo, done, tasks))
+            worker.daemon = True
+            worker.start()
+            workers.append(worker)
+        #
+        doneCnt = 0
+        while doneCnt < len(self.urls):
+            if self.abortHook():
+                self.logger.debug('abort requested - cancel {} pending download(s)', len(self.urls) - doneCnt)
+                self._cancelled.set()
+                break
+            try:
+                idx, data, error = done.get(timeout=0.1)
+            except Empty:
+                continue
+            results[idx].data = data
+            results[idx].error = error
+            doneCnt += 1
+            tasks[idx].finish()
+        #
+        for worker in workers:
+            worker.join()
+        #
+        for entry in results:
+            if entry.data is None and entry.error is None:
+                entry.error = IOError('Reception interrupted.')
+        self.logger.debug('retrieveAsString {} url(s) with {} worker(s) in {} sec', len(self.urls), self.maxWorkers, round(time.time() - startTime, 4))
+        return results
+
+    def _worker(self, pTodo, pDone, pTasks):
+        while not self._cancelled.is_set():
+            try:
+                idx = pTodo.get_nowait()
+            except Empty:
+                return
+            try:
+                resource = WebResource(
+                    self.addon,
+                    self.urls[idx],
+                    pHeader=self.header,
+                    pAbortHook=self._isCancelled,
+                    pProgressListener=pTasks[idx].update,
+                    pChunkSize=self.chunkSize,
+                    pTimeout=self.connectionTimeout,
+                    pCache=self.cache,
+                    pRetries=self.retries,
+                    pCircuitBreaker=self.circuitBreaker)
+                data = resource.retrieveAsString()
+                if self._cancelled.is_set():
+                    pDone.put((idx, None, IOError('Reception interrupted.')))
+                else:
+                    pDone.put((idx, data, None))
+            except Exception as err:
+                self.logger.warn('download failed {} {}', self.urls[idx], err)
+                pDone.put((idx, None, err))
+
+    def _isCancelled(self):
+        return self._cancelled.is_set()
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+On disk cache for http responses
+SPDX-License-Identifier: MIT
+"""
+
+# pylint: disable=too-many-lines,line-too-long
+import os
+import re
+import time
+import hashlib
+import threading
+from contextlib import closing
+#
+from . import utils as pyUtils
+
+MAX_AGE_PATTERN = re.compile(r'max-age\s*=\s*(\d+)')
+
+
+class WebCache(object):
+    """
+    Response cache under the addon data path
+
+    Bodies are stored decompressed, one file per entry, together with the
+    `ETag`, `Last-Modified` and `Cache-Control` information in a json index.
+    Stale entries are revalidated with a conditional request and a `304`
+    answer is served from disk. The total size is capped and the least
+    recently used entries are evicted first. The access times of cache
+    hits are only kept in memory until the index is written by the next
+    `store` or by `close`.
+
+    """
+
+    def __init__(self, pAddon, pMaxSize=20 * 1024 * 1024, pVaryHeaders=None, pCacheDir=None):
+        self.addon = pAddon
+        self.logger = pAddon.createLogger('WebCache')
+        self.cacheDir = pCacheDir if pCacheDir is not None else pyUtils.createPath((pAddon.getAddonDataPath(), 'webcache'))
+        self.indexFile = pyUtils.createPath((self.cacheDir, 'index.json'))
+        self.maxSize = pMaxSize
+        # request header which change the response - Accept-Encoding is not relevant as the body is stored decompressed
+        self.varyHeaders = pVaryHeaders if pVaryHeaders is not None else ['Accept', 'Accept-Language', 'Authorization', 'Cookie']
+        #
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._index = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def getKey(self, pUrl, pHeader):
+        """ Build the cache key out of url and relevant request header """
+        parts = [pUrl]
+        lowerHeader = dict((k.lower(), v) for k, v in list(pHeader.items()))
+        for name in self.varyHeaders:
+            parts.append('{}={}'.format(name.lower(), lowerHeader.get(name.lower(), '')))
+        return hashlib.sha1(pyUtils.py2_encode('\n'.join(parts)).encode('utf-8')).hexdigest()
+
+    def lookup(self, pKey):
+        """
+        Get the metadata of a cached response
+
+        Returns:
+            dict: the index entry or `None`
+        """
+        with self._lock:
+            entry = self._getIndex().get(pKey)
+            if entry is not None and not pyUtils.file_exists(self._bodyFile(pKey)):
+                del self._index[pKey]
+                entry = None
+            return dict(entry) if entry is not None else None
+
+    def isFresh(self, pEntry):
+        """ Check if the entry can be served without asking the server """
+        return pEntry.get('expires', 0) > time.time()
+
+    def conditionalHeader(self, pEntry):
+        """ Request header to revalidate a cached entry """
+        header = {}
+        if pEntry.get('etag'):
+            header['If-None-Match'] = pEntry['etag']
+        if pEntry.get('lastModified'):
+            header['If-Modified-Since'] = pEntry['lastModified']
+        return header
+
+    def load(self, pKey, pReason='hit'):
+        """ Read the cached body and mark the entry as recently used """
+        with self._lock:
+            entry = self._getIndex().get(pKey)
+            try:
+                with closing(open(self._bodyFile(pKey), 'rb')) as bodyFile:
+                    data = bodyFile.read()
+            except (IOError, OSError) as err:
+                self.logger.warn('unable to read cache entry {} {}', pKey, err)
+                self._remove(pKey)
+                self._save()
+                return None
+            if entry is not None:
+                # written with the next store or close - not worth an index write per hit
+                entry['lastAccess'] = time.time()
+                self._dirty = True
+            self.hits += 1
+            if pReason == 'revalidated':
+                self.revalidated += 1
+        self.logger.debug('cache {} {} ({} hits / {} misses / {} revalidated)', pReason, entry.get('url') if entry else pKey, self.hits, self.misses, self.revalidated)
+        return data
+
+    def refresh(self, pKey, pResponseHeader):
+        """ Update validators and expiry after a `304` answer """
+        with self._lock:
+            entry = self._getIndex().get(pKey)
+            if entry is not None:
+                self._updateMeta(entry, pResponseHeader)
+                self._save()
+
+    def miss(self, pUrl):
+        """ Count a request which could not be served from the cache """
+        self.misses += 1
+        self.logger.debug('cache miss {} ({} hits / {} misses / {} revalidated)', pUrl, self.hits, self.misses, self.revalidated)
+
+    def store(self, pKey, pUrl, pData, pResponseHeader):
+        """ Store a decompressed body with its validators """
+        cacheControl = (pResponseHeader.get('Cache-Control') or '').lower()
+        if 'no-store' in cacheControl or len(pData) > self.maxSize:
+            return
+        entry = {'url': pUrl, 'size': len(pData), 'lastAccess': time.time()}
+        self._updateMeta(entry, pResponseHeader)
+        if not entry.get('etag') and not entry.get('lastModified') and entry['expires'] <= time.time():
+            # could neither be served nor revalidated
+            with self._lock:
+                if pKey in self._getIndex():
+                    self._remove(pKey)
+                    self._save()
+            return
+        with self._lock:
+            if not pyUtils.dir_exists(self.cacheDir):
+                os.makedirs(self.cacheDir)
+            tmpFile = self._bodyFile(pKey) + '.tmp'
+            with closing(open(tmpFile, 'wb')) as bodyFile:
+                bodyFile.write(pData)
+            pyUtils.file_rename(tmpFile, self._bodyFile(pKey))
+            #
+            self._getIndex()[pKey] = entry
+            self._evict()
+            self._save()
+
+    def close(self):
+        """ Write the access times of the cache hits """
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def clear(self):
+        """ Remove all cached responses """
+        with self._lock:
+            for key in list(self._getIndex().keys()):
+                self._remove(key)
+            self._save()
+
+    #########################################
+
+    def _updateMeta(self, pEntry, pResponseHeader):
+        etag = pResponseHeader.get('ETag')
+        lastModified = pResponseHeader.get('Last-Modified')
+        if etag:
+            pEntry['etag'] = etag
+        if lastModified:
+            pEntry['lastModified'] = lastModified
+        cacheControl = (pResponseHeader.get('Cache-Control') or '').lower()
+        maxAge = MAX_AGE_PATTERN.search(cacheControl)
+        if maxAge and 'no-cache' not in cacheControl:
+            pEntry['expires'] = time.time() + int(maxAge.group(1))
+        else:
+            pEntry['expires'] = 0
+
+    def _evict(self):
+        total = sum(e.get('size', 0) for e in list(self._index.values()))
+        if total <= self.maxSize:
+            return
+        for key, entry in sorted(list(self._index.items()), key=lambda e: e[1].get('lastAccess', 0)):
+            total -= entry.get('size', 0)
+            self._remove(key)
+            self.logger.debug('cache evict {}', entry.get('url'))
+            if total <= self.maxSize:
+                break
+
+    def _remove(self, pKey):
+        pyUtils.file_remove(self._bodyFile(pKey))
+        self._index.pop(pKey, None)
+
+    def _bodyFile(self, pKey):
+        return pyUtils.createPath((self.cacheDir, pKey + '.body'))
+
+    def _getIndex(self):
+        if self._index is None:
+            self._index = {}
+            if pyUtils.file_exists(self.indexFile):
+                try:
+                    self._index = pyUtils.loadJson(self.indexFile)
+                except Exception as err:
+                    self.logger.warn('cache index unreadable - start empty {}', err)
+        return self._index
+
+    def _save(self):
+        if not pyUtils.dir_exists(self.cacheDir):
+            os.makedirs(self.cacheDir)
+        tmpFile = self.indexFile + '.tmp'
+        pyUtils.saveJson(tmpFile, self._index)
+        pyUtils.file_rename(tmpFile, self.indexFile)
+        self._dirty = False
@@ -5,23 +5,36 @@ SPDX-License-Identifier: MIT
 
 # pylint: disable=too-many-lines,line-too-long
 #
+import os
 import time
-import zlib
+import random
+import socket
 from contextlib import closing
 #
 try:
-    from urllib.parse import urlparse, urlencode
-    from urllib.request import urlopen, Request
+    from urllib.parse import urlparse, urlencode, urljoin
     from urllib.error import HTTPError
+    from http.client import HTTPException
     from io import BytesIO
     # from io import StringIO
     PY2FOUND = False
 except ImportError:
-    from urlparse import urlparse
+    from urlparse import urlparse, urljoin
     from urllib import urlencode
-    from urllib2 import urlopen, Request, HTTPError
+    from urllib2 import HTTPError
+    from httplib import HTTPException
     from cStringIO import StringIO
     PY2FOUND = True
+#
+from . import utils as pyUtils
+from . import contentDecoder
+from .connectionPool import ConnectionPool
+from .circuitBreaker import CircuitOpenError
+from .jsonStream import JsonStreamParser
+from .tracer import Tracer
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 10
 
 
 class WebResource(object):
@@ -35,17 +48,22 @@ class WebResource(object):
 
     """
 
-    def __init__(self, pAddon, pUrl, pHeader = None, pAbortHook = None, pProgressListener = None, pChunkSize=8192, pTimeout=10):
+    def __init__(self, pAddon, pUrl, pHeader = None, pAbortHook = None, pProgressListener = None, pChunkSize=8192, pTimeout=10, pPool=None, pCache=None, pRetries=0, pBackoff=0.5, pCircuitBreaker=None):
         self.addon = pAddon
         self.logger = pAddon.createLogger('WebResource')
-        self.abortHook = pAddon.getAbortHook()
-        self.progressListener = pAddon.getProgressDialog().updateProgress
+        self.abortHook = pAbortHook if pAbortHook is not None else pAddon.getAbortHook()
+        self.progressListener = pProgressListener if pProgressListener is not None else pAddon.getProgressDialog().updateProgress
         #
         self.connectionTimeout = pTimeout
+        self.pool = pPool if pPool is not None else ConnectionPool()
+        self.cache = pCache
+        self.retries = pRetries
+        self.backoff = pBackoff
+        self.circuitBreaker = pCircuitBreaker
         self.chunkSize = pChunkSize
         if pHeader == None:
             self.header = {
-                'Accept-Encoding':'gzip, deflate',
+                'Accept-Encoding':contentDecoder.acceptEncoding(),
                 'User-Agent':'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:98.0) Gecko/20100101 Firefox/98.0'
             }
         else:
@@ -54,58 +72,374 @@ class WebResource(object):
         self.url = pUrl
         #
         self.startTime = 0
+        self.contentLength = 0
+        self.tracer = Tracer()
 
     def retrieveAsString(self):
+        with self.logger.span('retrieveAsString', url=self.url) as span:
+            rs = self._retrieveAsString()
+            span.set(bytes=len(rs))
+            return rs
+
+    def _retrieveAsString(self):
         #
         self.startTime = time.time()
-        request = Request(self.url)
-        self.logger.debug('url {}',self.url)
-        #
-        for kkey,vvalue in list(self.header.items()):
-            request.add_header(kkey, vvalue)
-            self.logger.debug('header {} {}',kkey,vvalue)
-        #
-        rsArrayBuffer = []
-        #
-        with closing(urlopen(request, timeout=self.connectionTimeout)) as response:
+        cacheKey, outputString, opened = self._open()
+        if outputString is not None:
+            return outputString
+        response, poolKey, conn = opened
+        try:
             #
-            content_encoding = response.info().get('Content-Encoding')
-            self.logger.debug('content_encoding {}', content_encoding )
+            outputString = b''.join(self._readResponse(response))
             #
-            content_length = response.info().get("Content-Length")
-            content_length = int(content_length) if content_length else self.chunkSize*100
-            self.logger.debug('content_length {}',content_length )
+            if self.cache is not None and response.isclosed():
+                self.cache.store(cacheKey, self.url, outputString, response.msg)
             #
-            cycleCnt = 1
-            #
-            if content_encoding == 'gzip':
-                decomp = zlib.decompressobj(16+zlib.MAX_WBITS)
-            elif content_encoding == 'deflate':
-                decomp = zlib.decompressobj(-zlib.MAX_WBITS)
-            else:
-                decomp = None
+        finally:
+            self._releaseResponse(response, poolKey, conn)
+        self.logger.debug('retrieveAsString {} bytes(s) in {} sec for {}', self.contentLength, round(time.time() - self.startTime, 4), self.url)
+        return outputString
+
+    def retrieveAsJsonStream(self, *args):
+        """
+        Download a json document and parse it while it is received
+
+        Generator of the items of the array selected by the search path
+        (see `utils.extractJsonValue`). The body is never held in memory
+        completely so the response is not stored in the cache, but a
+        cached response is still used.
+
+        Args:
+            args: search path to the array e.g. 'data', 'items'
+        """
+        self.startTime = time.time()
+        parser = JsonStreamParser(*args)
+        itemCnt = 0
+        cacheKey, outputString, opened = self._open()
+        if outputString is not None:
+            parser.feed(outputString)
+            parser.close()
+            for item in parser.items():
+                yield item
+            return
+        response, poolKey, conn = opened
+        # time spent in the parser - not in the consumer of the items
+        parseTime = 0
+        try:
+            for outstr in self._readResponse(response):
+                parseStart = time.time()
+                parser.feed(outstr)
+                items = list(parser.items())
+                parseTime += time.time() - parseStart
+                for item in items:
+                    itemCnt += 1
+                    yield item
+            if response.isclosed():
+                parseStart = time.time()
+                parser.close()
+                items = list(parser.items())
+                parseTime += time.time() - parseStart
+                for item in items:
+                    itemCnt += 1
+                    yield item
+        finally:
+            self._releaseResponse(response, poolKey, conn)
+        self.tracer.record('WebResource.parse', self.startTime, parseTime, url=self.url, items=itemCnt)
+        self.logger.debug('retrieveAsJsonStream {} item(s) from {} bytes(s) in {} sec for {}', itemCnt, self.contentLength, round(time.time() - self.startTime, 4), self.url)
+
+    def retrieveToFile(self, pFilename):
+        """
+        Download the url into a file
+
+        The data is written to `pFilename.part` first and renamed once the
+        download is complete. An existing part file is resumed with a http
+        range request. The part file holds the decompressed content so a
+        resume asks for the identity encoding.
+
+        Args:
+            pFilename(str): full pathname of the destination file
+
+        Returns:
+            bool: `True` if the download is complete, `False` if it was aborted
+        """
+        with self.logger.span('retrieveToFile', url=self.url):
+            return self._retrieveToFile(pFilename)
+
+    def _retrieveToFile(self, pFilename):
+        self.startTime = time.time()
+        partFile = pFilename + '.part'
+        offset = pyUtils.file_size(partFile)
+        self.logger.debug('url {} to {} resume at {}', self.url, pFilename, offset)
+        #
+        if offset > 0:
+            try:
+                response, poolKey, conn = self._connect(self.url, {'Range': 'bytes={}-'.format(offset), 'Accept-Encoding': 'identity'})
+            except HTTPError as err:
+                if err.code != 416:
+                    raise
+                self.logger.debug('range not satisfiable - restart download')
+                pyUtils.file_remove(partFile)
+                offset = 0
+        if offset == 0:
+            response, poolKey, conn = self._connect(self.url)
+        #
+        try:
+            if offset > 0:
+                contentRange = response.getheader('Content-Range') or ''
+                if response.status != 206 or not contentRange.startswith('bytes {}-'.format(offset)):
+                    self.logger.debug('server ignored range ({} {}) - restart download', response.status, contentRange)
+                    offset = 0
             #
-            buffer=response.read(self.chunkSize)
+            content_encoding = response.getheader('Content-Encoding')
+            content_length = response.getheader("Content-Length")
+            content_length = offset + int(content_length) if content_length else offset + self.chunkSize*100
+            self.contentLength = content_length
+            self.logger.debug('content_encoding {} content_length {}', content_encoding, content_length)
+            decomp = self._createDecompressor(content_encoding)
             #
-            while buffer and not self.abortHook():
+            done = offset
+            with closing(open(partFile, 'ab' if offset > 0 else 'wb')) as dst:
                 if decomp:
-                    outstr = decomp.decompress(buffer)
+                    decompressedCnt = 0
+                    decodeTime = 0
+                    buffer = response.read(self.chunkSize)
+                    while buffer and not self.abortHook():
+                        decodeStart = time.time()
+                        outstr = decomp.decompress(buffer)
+                        decodeTime += time.time() - decodeStart
+                        dst.write(outstr)
+                        decompressedCnt += len(outstr)
+                        done += len(buffer)
+                        self.progressListener(done, content_length)
+                        buffer = response.read(self.chunkSize)
+                    if not buffer:
+                        decodeStart = time.time()
+                        outstr = decomp.flush()
+                        decodeTime += time.time() - decodeStart
+                        dst.write(outstr)
+                        decompressedCnt += len(outstr)
+                        self._logDecodeStats(content_encoding, done, decompressedCnt, decodeTime)
                 else:
-                    outstr = buffer
-                #
-                rsArrayBuffer.append(outstr)
-                buffer=response.read(self.chunkSize)
-                cycleCnt += 1
-                self.progressListener(cycleCnt*self.chunkSize, content_length)
-            #
+                    # one reused buffer - no copy per chunk
+                    buffer = bytearray(self.chunkSize)
+                    view = memoryview(buffer)
+                    readCnt = response.readinto(view)
+                    while readCnt and not self.abortHook():
+                        dst.write(view[:readCnt])
+                        done += readCnt
+                        self.progressListener(done, content_length)
+                        readCnt = response.readinto(view)
+                dst.flush()
+                os.fsync(dst.fileno())
+            complete = response.isclosed()
+        finally:
+            self._releaseResponse(response, poolKey, conn)
+        #
+        if not complete:
+            self.logger.debug('retrieveToFile aborted after {} bytes(s) for {}', done, self.url)
+            return False
+        if not pyUtils.file_rename(partFile, pFilename):
+            raise IOError('Unable to rename {} to {}'.format(partFile, pFilename))
+        self.logger.debug('retrieveToFile {} bytes(s) in {} sec for {}', done, round(time.time() - self.startTime, 4), self.url)
+        return True
+
+    def _open(self):
+        """
+        Serve the request from the cache or open the response
+
+        Returns:
+            tuple: (cache key, cached body or `None`, (response, pool key, connection) or `None`)
+        """
+        self.logger.debug('url {}',self.url)
+        #
+        for kkey,vvalue in list(self.header.items()):
+            self.logger.debug('header {} {}',kkey,vvalue)
+        #
+        cacheKey = None
+        conditionalHeader = None
+        if self.cache is not None:
+            cacheKey = self.cache.getKey(self.url, self.header)
+            cacheEntry = self.cache.lookup(cacheKey)
+            if cacheEntry is not None:
+                if self.cache.isFresh(cacheEntry):
+                    outputString = self.cache.load(cacheKey)
+                    if outputString is not None:
+                        return (cacheKey, outputString, None)
+                conditionalHeader = self.cache.conditionalHeader(cacheEntry)
+        #
+        response, poolKey, conn = self._connect(self.url, conditionalHeader)
+        if response.status == 304 and self.cache is not None:
+            self._releaseResponse(response, poolKey, conn, True)
+            self.cache.refresh(cacheKey, response.msg)
+            outputString = self.cache.load(cacheKey, 'revalidated')
+            if outputString is not None:
+                self.logger.debug('not modified in {} sec for {}', round(time.time() - self.startTime, 4), self.url)
+                return (cacheKey, outputString, None)
+            # cache entry vanished in the meantime
+            response, poolKey, conn = self._connect(self.url)
+        elif self.cache is not None:
+            self.cache.miss(self.url)
+        return (cacheKey, None, (response, poolKey, conn))
+
+    def _readResponse(self, pResponse):
+        """ Generator of the decompressed chunks of the response body """
+        content_encoding = pResponse.getheader('Content-Encoding')
+        self.logger.debug('content_encoding {}', content_encoding )
+        #
+        content_length = pResponse.getheader("Content-Length")
+        content_length = int(content_length) if content_length else self.chunkSize*100
+        self.contentLength = content_length
+        self.logger.debug('content_length {}',content_length )
+        #
+        cycleCnt = 1
+        #
+        decomp = self._createDecompressor(content_encoding)
+        #
+        readStart = time.time()
+        buffer=pResponse.read(self.chunkSize)
+        readTime = time.time() - readStart
+        #
+        compressedCnt = 0
+        decompressedCnt = 0
+        decodeTime = 0
+        #
+        while buffer and not self.abortHook():
             if decomp:
-                outstr = decomp.flush()
-                rsArrayBuffer.append(outstr)
+                decodeStart = time.time()
+                outstr = decomp.decompress(buffer)
+                decodeTime += time.time() - decodeStart
+                compressedCnt += len(buffer)
+                decompressedCnt += len(outstr)
+            else:
+                outstr = buffer
             #
-            outputString = b''.join(rsArrayBuffer)
+            yield outstr
+            readStart = time.time()
+            buffer=pResponse.read(self.chunkSize)
+            readTime += time.time() - readStart
+            cycleCnt += 1
+            self.progressListener(cycleCnt*self.chunkSize, content_length)
+        #
+        if decomp and not buffer:
+            decodeStart = time.time()
+            outstr = decomp.flush()
+            decodeTime += time.time() - decodeStart
+            decompressedCnt += len(outstr)
+            self._logDecodeStats(content_encoding, compressedCnt, decompressedCnt, decodeTime)
+            yield outstr
+        self.tracer.record('WebResource.read', self.startTime, readTime, url=self.url, chunks=cycleCnt)
+
+    def _createDecompressor(self, pContentEncoding):
+        decomp = contentDecoder.createDecoder(pContentEncoding)
+        if decomp is None and pContentEncoding and pContentEncoding.lower() != 'identity':
+            self.logger.warn('unsupported content encoding {} for {}', pContentEncoding, self.url)
+        return decomp
+
+    def _logDecodeStats(self, pContentEncoding, pCompressed, pDecompressed, pDecodeTime):
+        self.tracer.record('WebResource.decompress', self.startTime, pDecodeTime, encoding=pContentEncoding, compressed=pCompressed, decompressed=pDecompressed)
+        self.logger.debug('decoded {} {} -> {} bytes(s) ratio {} in {} sec', pContentEncoding, pCompressed, pDecompressed, round(pDecompressed / (pCompressed * 1.0), 2) if pCompressed else 0, round(pDecodeTime, 4))
+
+    def _connect(self, pUrl, pExtraHeader=None):
+        """
+        Open the response with retries and the circuit breaker
+
+        Connection errors, timeouts, 5xx and 429 answers are retried with an
+        exponential backoff and jitter. Other http errors are final.
+        """
+        host = urlparse(pUrl).hostname
+        if self.circuitBreaker is not None and not self.circuitBreaker.allowRequest(host):
+            raise CircuitOpenError('Circuit open for host {}'.format(host))
+        attempt = 0
+        while True:
+            try:
+                with self.logger.span('connect', url=pUrl, attempt=attempt):
+                    rs = self._openResponse(pUrl, pExtraHeader)
+                if self.circuitBreaker is not None:
+                    self.circuitBreaker.recordSuccess(host)
+                return rs
+            except HTTPError as err:
+                if err.code < 500 and err.code != 429:
+                    # the host is alive
+                    if self.circuitBreaker is not None:
+                        self.circuitBreaker.recordSuccess(host)
+                    raise
+                error = err
+            except (HTTPException, socket.error) as err:
+                error = err
             #
-        self.logger.debug('retrieveAsString {} bytes(s) in {} sec for {}', content_length, round(time.time() - self.startTime, 4), self.url)
-        return outputString
-            
+            if attempt >= self.retries or self.abortHook():
+                if self.circuitBreaker is not None:
+                    self.circuitBreaker.recordFailure(host)
+                raise error
+            delay = random.uniform(0.5, 1.0) * self.backoff * (2 ** attempt)
+            attempt += 1
+            self.logger.warn('retry {} of {} in {} sec for {} - {}', attempt, self.retries, round(delay, 2), pUrl, error)
+            waitUntil = time.time() + delay
+            while time.time() < waitUntil and not self.abortHook():
+                time.sleep(min(0.1, max(0, waitUntil - time.time())))
+
+    def _openResponse(self, pUrl, pExtraHeader=None):
+        """
+        Send the GET request on a pooled keep-alive connection and follow redirects
+
+        Returns:
+            tuple: (response, pool key, connection)
+        """
+        url = pUrl
+        for _ in range(MAX_REDIRECTS + 1):
+            response, poolKey, conn = self._request(url, pExtraHeader)
+            if response.status in REDIRECT_CODES and response.getheader('Location'):
+                location = urljoin(url, response.getheader('Location'))
+                self._releaseResponse(response, poolKey, conn, True)
+                self.logger.debug('redirect {} to {}', response.status, location)
+                url = location
+                continue
+            if response.status >= 400:
+                # same behaviour as urlopen
+                body = BytesIO(response.read())
+                self._releaseResponse(response, poolKey, conn)
+                raise HTTPError(url, response.status, response.reason, response.msg, body)
+            return (response, poolKey, conn)
+        raise HTTPError(url, response.status, 'too many redirects', response.msg, None)
+
+    def _request(self, pUrl, pExtraHeader=None):
+        parsed = urlparse(pUrl)
+        scheme = parsed.scheme.lower()
+        port = parsed.port or (443 if scheme == 'https' else 80)
+        path = parsed.path or '/'
+        if parsed.query:
+            path = path + '?' + parsed.query
+        header = dict(self.header)
+        header.setdefault('Connection', 'keep-alive')
+        if pExtraHeader:
+            header.update(pExtraHeader)
+        #
+        while True:
+            poolKey, conn, reused = self.pool.acquire(scheme, parsed.hostname, port, self.connectionTimeout)
+            self.logger.debug('{} connection to {}:{}', 'reuse' if reused else 'new', parsed.hostname, port)
+            try:
+                conn.request('GET', path, headers=header)
+                response = conn.getresponse()
+                return (response, poolKey, conn)
+            except (HTTPException, socket.error) as err:
+                self.pool.discard(conn)
+                # the server closed an idle keep-alive connection - try again with a fresh one
+                if not reused or isinstance(err, socket.timeout):
+                    raise
+                self.logger.debug('stale connection dropped {}', err)
+
+    def _releaseResponse(self, pResponse, pPoolKey, pConnection, pDrain=False):
+        if pDrain:
+            try:
+                pResponse.read()
+            except (HTTPException, socket.error):
+                pass
+        if pResponse.isclosed() and not pResponse.will_close:
+            self.pool.release(pPoolKey, pConnection)
+        else:
+            # incomplete read (e.g. abort) or server wants to close
+            pResponse.close()
+            self.pool.discard(pConnection)
+
     def _progressListener(self, pDone, pTotal):
         pass
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the incremental json parser
+SPDX-License-Identifier: MIT
+"""
+import os
+import sys
+import json
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from ckfw.jsonStream import JsonStreamParser
+from ckfw import utils as pyUtils
+
+# (document, search path)
+DOCUMENTS = [
+    ('[1.5, 2.5, -3, 4e2, 5E-1, 0.25e+3, 6]', ()),
+    ('{"v": 12.5, "items": [1, 22, 333.75]}', ('items',)),
+    ('[3e2]', ()),
+    ('{"data": {"total": 1.5e3, "items": [{"id": 1, "t": "a\\u00e4"}, {"id": 2.5, "t": "x]"}, null, true, false, "ü"]}}', ('data', 'items')),
+    ('{"a": [10, {"b": [7.125, 8]}]}', ('a', 1, 'b')),
+    ('{"a": 1}', ('missing',)),
+    ('{"a": 1.75}', ('a',)),
+    ('  [ ]  ', ()),
+]
+
+
+def parseChunks(pChunks, pPath):
+    parser = JsonStreamParser(*pPath)
+    items = []
+    for chunk in pChunks:
+        parser.feed(chunk)
+        items.extend(parser.items())
+    parser.close()
+    items.extend(parser.items())
+    return items
+
+
+def expectedItems(pDocument, pPath):
+    value = pyUtils.extractJsonValue(json.loads(pDocument), *pPath) if pPath else json.loads(pDocument)
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+class TestJsonStreamParser(unittest.TestCase):
+
+    def test_every_split_offset(self):
+        for document, path in DOCUMENTS:
+            data = document.encode('utf-8')
+            expected = expectedItems(document, path)
+            for offset in range(len(data) + 1):
+                self.assertEqual(parseChunks([data[:offset], data[offset:]], path), expected, 'split at {} of {}'.format(offset, document))
+
+    def test_byte_by_byte(self):
+        for document, path in DOCUMENTS:
+            data = document.encode('utf-8')
+            self.assertEqual(parseChunks([data[i:i + 1] for i in range(len(data))], path), expectedItems(document, path), document)
+
+    def test_number_split_before_fraction(self):
+        self.assertEqual(parseChunks([b'[1.5, 2.', b'5]'], ()), [1.5, 2.5])
+        self.assertEqual(parseChunks([b'[3e', b'2]'], ()), [300.0])
+        self.assertEqual(parseChunks([b'{"v": 12.', b'5, "items": [1]}'], ('items',)), [1])
+
+    def test_invalid_document(self):
+        self.assertRaises(ValueError, parseChunks, [b'[1, 2.', b'x]'], ())
+        self.assertRaises(ValueError, parseChunks, [b'[1, 2'], ())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the swap detection of SqliteDB
+SPDX-License-Identifier: MIT
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+BASE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(BASE, '..', 'benchmarks', 'fakekodi'), os.path.join(BASE, '..', 'lib')]
+
+from ckfw import sqliteDB
+from ckfw.logger import Logger
+from ckfw.sqliteDB import SqliteDB
+
+
+class FakeAddon(object):
+
+    def createLogger(self, topic=None):
+        return Logger('ckfw.test', '1.0.0', topic)
+
+
+class TestSwapDetection(unittest.TestCase):
+
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp(prefix='ckfwtest')
+        self.filename = os.path.join(self.tempDir, 'test.db')
+        self.addon = FakeAddon()
+        # check the file identity on every access
+        self.interval = sqliteDB.SWAP_CHECK_INTERVAL
+        sqliteDB.SWAP_CHECK_INTERVAL = -1
+        self.databases = []
+
+    def tearDown(self):
+        sqliteDB.SWAP_CHECK_INTERVAL = self.interval
+        for db in self.databases:
+            db.exit()
+        shutil.rmtree(self.tempDir, ignore_errors=True)
+
+    def createDb(self):
+        db = SqliteDB(self.addon, self.filename, 'safe')
+        self.databases.append(db)
+        return db
+
+    def rebuild(self, pDb, pValues):
+        with pDb.rebuild() as shadow:
+            shadow.execute('CREATE TABLE t (v INTEGER)')
+            shadow.executeMany('INSERT INTO t VALUES (?)', [(v,) for v in pValues])
+
+    def liveValues(self):
+        reader = SqliteDB(self.addon, self.filename, 'safe')
+        try:
+            return [row[0] for row in reader.execute('SELECT v FROM t ORDER BY v')]
+        finally:
+            reader.exit()
+
+    def test_transaction_after_rebuild_by_other_instance(self):
+        writer = self.createDb()
+        self.rebuild(writer, [1])
+        with writer.transaction():
+            writer.executeUpdate('INSERT INTO t VALUES (?)', (2,))
+        self.rebuild(self.createDb(), [10])
+        with writer.transaction():
+            writer.executeUpdate('INSERT INTO t VALUES (?)', (11,))
+        self.assertEqual(self.liveValues(), [10, 11])
+
+    def test_writer_mode_after_rebuild_by_other_instance(self):
+        db = self.createDb()
+        self.rebuild(db, [1])
+        db.startWriter()
+        db.queueUpdate('INSERT INTO t VALUES (?)', (2,))
+        db.flushWriter()
+        self.assertEqual([row[0] for row in db.execute('SELECT v FROM t ORDER BY v')], [1, 2])
+        self.rebuild(self.createDb(), [10])
+        self.assertEqual([row[0] for row in db.execute('SELECT v FROM t ORDER BY v')], [10])
+        db.queueUpdate('INSERT INTO t VALUES (?)', (11,))
+        db.flushWriter()
+        self.assertEqual([row[0] for row in db.execute('SELECT v FROM t ORDER BY v')], [10, 11])
+        db.stopWriter()
+        self.assertEqual(self.liveValues(), [10, 11])
+
+    def test_writer_mode_creates_missing_file(self):
+        db = self.createDb()
+        db.startWriter()
+        db.queueUpdate('CREATE TABLE t (v INTEGER)')
+        db.flushWriter()
+        self.assertEqual(db.execute('SELECT count(*) FROM t'), [(0,)])
+
+    def test_open_iterator_keeps_connection(self):
+        db = self.createDb()
+        self.rebuild(db, range(50))
+        db.execute('CREATE TABLE u (v INTEGER)')
+        rowCnt = 0
+        for row in db.executeIterator('SELECT v FROM t', aPageSize=10):
+            db.executeUpdate('INSERT INTO u VALUES (?)', (row[0],))
+            rowCnt += 1
+        self.assertEqual(rowCnt, 50)
+        self.assertEqual(db.execute('SELECT count(*) FROM u'), [(50,)])
+
+
+if __name__ == '__main__':
+    unittest.main()